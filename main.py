@@ -1,20 +1,45 @@
+import time
+IMPORT_START = time.perf_counter()  # For --startup-timing, taken before the heavy imports
+
 import pygame
+import argparse
+import concurrent.futures
+import copy
+import json
+import math
+import os
+import platform
+import queue
 import random
+import struct
 import sys
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+
+import numpy as np
 
-# Initialize Pygame
-pygame.init()
+# Pygame is initialized by init_pygame() when a window is needed, never at import time
 
 # ---------------------------
 # Global Constants & Settings
 # ---------------------------
+# Logical resolution: gameplay, collision and the screen layout are defined at this size
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+RENDER_SCALE = 1.0  # Internal render resolution relative to the logical one
+FPS = 60  # Render frame cap (0 = uncapped)
+
+# Gameplay runs on a fixed timestep, independent of the render frame rate
+TICK_RATE = 60  # Simulation ticks per second (the rate difficulty is tuned for)
+TICK_MS = 1000 / TICK_RATE
+MAX_CATCH_UP_STEPS = 5  # Max ticks per rendered frame before dropping time
+IDLE_WAIT_MS = 1000  # Longest the menu and game over screens sleep waiting for input
 
 # These values define our perspective "window."
-HORIZON = 150          # Y coordinate of the horizon line (top of the road)
-GROUND_Y = 550         # Y coordinate where the ground (road) meets the bottom
+HORIZON = SCREEN_HEIGHT // 4          # Y coordinate of the horizon line (top of the road)
+GROUND_Y = SCREEN_HEIGHT * 11 // 12   # Y coordinate where the ground (road) meets the bottom
 
 # Colors (RGB)
 SKY_BLUE = (135, 206, 235)
@@ -43,6 +68,56 @@ DIFFICULTIES = {
 # Update ROAD_SPEED to match obstacle speeds
 ROAD_SPEED = DIFFICULTIES['MEDIUM']['speed']  # Use medium difficulty as base speed
 
+# World x of each lane, left to right (shared by the player and obstacles)
+LANES = [-150, 0, 150]
+
+# Road rendering
+ROAD_DASHES = 40  # Number of dash segments along each lane line
+BACKGROUND_CACHE_BUDGET = 32 * 1024 * 1024  # Max bytes of pre-rendered road frames at the logical resolution
+BACKGROUND_PHASES_PER_STEP = 2  # Cached phases per frame of road movement
+DIRTY_STRIP_HEIGHT = 24  # Height of the strips lane lines are repainted in
+
+# Quality levels the governor steps down through when frames miss their budget.
+# Lane-line strips are most of the pixels pushed per frame and are only repainted when
+# the road phase changes, so below one road phase per frame they move every few frames.
+# resolution scales the internal render surface, which pygame.SCALED stretches on the GPU.
+QUALITY_LEVELS = [
+    {'name': 'high', 'road_phases': BACKGROUND_PHASES_PER_STEP, 'shadow': True, 'resolution': 1.0},
+    {'name': 'medium', 'road_phases': 1 / 2, 'shadow': True, 'resolution': 1.0},
+    {'name': 'low', 'road_phases': 1 / 3, 'shadow': False, 'resolution': 1.0},
+    {'name': 'lowest', 'road_phases': 1 / 3, 'shadow': False, 'resolution': 0.5}
+]
+QUALITY_WINDOW = 60  # Frames measured before each governor decision
+QUALITY_STEP_DOWN = 0.9  # Step down when p90 frame work is over this fraction of the budget
+QUALITY_STEP_UP = 0.5  # Step up when p90 frame work is under this fraction of the budget
+QUALITY_MAX_UP_DELAY = 3600  # Longest wait in frames before retrying a level that was too slow
+
+# Entity rendering
+PROJECTION_STEPS = 4096  # Projection table entries per unit of world_y
+
+# Obstacle patterns
+PATTERN_LOOKAHEAD_MS = 3000  # How far ahead obstacle chunks are generated
+PATTERN_SLACK_TICKS = 6  # Reaction margin when checking a chunk is passable
+PATTERN_REROLLS = 8  # Attempts at a passable chunk before thinning it out
+
+# Fonts are resolved once and remembered here, scanning system fonts is slow
+FONT_CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                               'endless-runner', 'fonts.json')
+
+# Leaderboard of finished runs, kept per difficulty and player color
+LEADERBOARD_PATH = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'),
+                                'endless-runner', 'leaderboard.bin')
+LEADERBOARD_TOP_K = 10  # Scores kept for each difficulty and color
+LEADERBOARD_COMPACT_AT = 10000  # Records in the file before it is cut back to the top scores
+
+# Profiling
+PROFILE_FRAMES = 600  # Frames kept in the profiler ring buffer
+PROFILE_PHASES = ['events', 'player', 'obstacles', 'spawn', 'collision',
+                  'background', 'entities', 'text', 'overlay', 'flip']
+
+# Text rendering
+TEXT_CACHE_SIZE = 128  # Max rendered text Surfaces kept by the text cache
+
 # ---------------------------
 # Projection Function
 # ---------------------------
@@ -60,6 +135,53 @@ def project(world_x, world_y, jump_offset=0):
     screen_y = HORIZON + (GROUND_Y - HORIZON) * world_y - jump_offset
     return int(screen_x), int(screen_y), scale
 
+# ---------------------------
+# Render Resolution
+# ---------------------------
+class Viewport:
+    """
+    Maps the logical SCREEN_WIDTH x SCREEN_HEIGHT layout onto the internal render
+    surface, scale times its size. The window shows that surface through
+    pygame.SCALED, which stretches it on the GPU, so a large window costs no more
+    to draw than the internal resolution.
+    """
+    def __init__(self, scale=RENDER_SCALE):
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        self.scale = scale
+        self.size = (round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale))
+
+    def point(self, x, y):
+        """Render surface position of a logical point"""
+        return (round(x * self.scale), round(y * self.scale))
+
+    def length(self, value):
+        """Render surface length of a logical length, at least one pixel"""
+        return max(1, round(value * self.scale))
+
+    def rect(self, x, y, width, height):
+        return pygame.Rect(self.point(x, y), (self.length(width), self.length(height)))
+
+viewport = Viewport()
+
+def set_render_scale(scale):
+    """Render at scale times the logical resolution from now on"""
+    viewport.set_scale(scale)
+    projection_table.set_resolution(scale)
+
+def open_window(caption, fullscreen=False):
+    """Window showing the internal render surface, scaled to fit on the GPU"""
+    flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else pygame.RESIZABLE)
+    try:
+        screen = pygame.display.set_mode(viewport.size, flags)
+    except pygame.error:
+        # Without a GPU renderer (e.g. the dummy driver) reopening a SCALED window fails,
+        # show the render surface unscaled instead
+        screen = pygame.display.set_mode(viewport.size, flags & ~pygame.SCALED)
+    pygame.display.set_caption(caption)
+    return screen
+
 # ---------------------------
 # Player Class
 # ---------------------------
@@ -87,8 +209,8 @@ class Player:
         self.jump_velocity = 0
         
         # Lane management
-        self.LANES = [-150, 0, 150]  # Left, Center, Right lanes only
-        self.current_lane = 1  # Start in center lane (index 1 now)
+        self.LANES = list(LANES)  # Left, Center, Right lanes
+        self.current_lane = len(self.LANES) // 2  # Start in center lane
         self.world_x = self.LANES[self.current_lane]
         self.target_x = self.world_x
         self.transition_speed = 0.15
@@ -96,16 +218,17 @@ class Player:
 
     def move(self, keys):
         # Lane-based movement with key press detection
-        if keys[pygame.K_a] and not self.last_key_state['a'] and self.current_lane > 0:  # Move left
+        # keys is the input dict built by read_inputs() ({'a': bool, 'd': bool, ...})
+        if keys['a'] and not self.last_key_state['a'] and self.current_lane > 0:  # Move left
             self.current_lane -= 1
             self.target_x = self.LANES[self.current_lane]
-        if keys[pygame.K_d] and not self.last_key_state['d'] and self.current_lane < len(self.LANES) - 1:  # Move right
+        if keys['d'] and not self.last_key_state['d'] and self.current_lane < len(self.LANES) - 1:  # Move right
             self.current_lane += 1
             self.target_x = self.LANES[self.current_lane]
             
         # Update previous key states
-        self.last_key_state['a'] = keys[pygame.K_a]
-        self.last_key_state['d'] = keys[pygame.K_d]
+        self.last_key_state['a'] = keys['a']
+        self.last_key_state['d'] = keys['d']
             
         # Smooth transition to target lane
         diff = self.target_x - self.world_x
@@ -121,6 +244,19 @@ class Player:
                 self.is_jumping = False
                 self.jump_velocity = 0
 
+    def get_hitbox(self):
+        """Return the player's screen-space hitbox and height without drawing anything"""
+        screen_x, screen_y, scale = project(self.world_x, self.world_y, self.height)
+        draw_width = int(self.width * scale)
+        draw_height = int(self.base_height * scale)
+        hitbox_rect = pygame.Rect(
+            screen_x - draw_width // 2,
+            screen_y - draw_height,
+            draw_width,
+            draw_height
+        )
+        return hitbox_rect, self.height
+
     def draw(self, surface):
         screen_x, screen_y, scale = project(self.world_x, self.world_y, self.height)
         draw_width = int(self.width * scale)
@@ -167,19 +303,16 @@ class Player:
 # Obstacle Class
 # ---------------------------
 class Obstacle:
-    def __init__(self, difficulty='MEDIUM'):
-        lane_options = [-150, 0, 150]
-        self.world_x = random.choice(lane_options)
+    """One obstacle drawn with pygame.draw, the benchmark's baseline for batched obstacle drawing"""
+    def __init__(self, rng=random):
+        lane_options = LANES
+        self.lane = rng.randrange(len(lane_options))
+        self.world_x = lane_options[self.lane]
         self.world_y = -0.2  # Start above the screen (negative value)
-        self.height = random.choice([0, 50])
+        self.height = rng.choice([0, 50])
         self.base_width = 50
         self.base_height = 50
         self.color = RED
-        self.speed = DIFFICULTIES[difficulty]['speed']
-        self.hitbox_height = 10  # Height of the collision hitbox
-
-    def update(self):
-        self.world_y += self.speed
 
     def draw(self, surface):
         screen_x, screen_y, scale = project(self.world_x, self.world_y)
@@ -205,29 +338,92 @@ class Obstacle:
         )
         return hitbox_rect, self.height
 
-    def is_off_screen(self):
-        # If the obstacle goes past the ground (with a little margin), it is removed
-        return self.world_y > 1.1
+# ---------------------------
+# Obstacle Field
+# ---------------------------
+class ObstacleField:
+    """
+    All live obstacles stored as contiguous NumPy columns (world_x, world_y, height, lane)
+    so advancing and culling are whole-array operations, and ProjectionTable.project_rects
+    turns the columns into screen rects in one call. Positions are kept as road_y plus the
+    distance travelled, the same form the CollisionIndex uses, so collision always sees the
+    world_y that is drawn. Obstacles are added by GameSimulation from ObstacleChunk patterns.
+    """
+    base_width = 50
+    base_height = 50
+
+    def __init__(self, capacity=64, lanes=LANES):
+        self.index = CollisionIndex(lanes, self.base_width, self.base_height)
+        self.world_x = np.zeros(capacity, dtype=np.float64)
+        self.road_y = np.zeros(capacity, dtype=np.float64)
+        self.world_y = np.zeros(capacity, dtype=np.float64)  # road_y + self.index.travelled
+        self.height = np.zeros(capacity, dtype=np.float64)
+        self.lane = np.zeros(capacity, dtype=np.int32)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = max(1, len(self.world_y)) * 2
+        for name in ('world_x', 'road_y', 'world_y', 'height', 'lane'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    def add(self, world_x, world_y, height, lane):
+        if self.count == len(self.world_y):
+            self._grow()
+        i = self.count
+        self.world_x[i] = world_x
+        self.road_y[i] = world_y - self.index.travelled
+        self.world_y[i] = self.road_y[i] + self.index.travelled
+        self.height[i] = height
+        self.lane[i] = lane
+        self.count += 1
+        self.index.add(lane, world_y, height)
+
+    def advance(self, speed):
+        """Move every obstacle towards the player by speed"""
+        self.index.advance(speed)
+        np.add(self.road_y[:self.count], self.index.travelled, out=self.world_y[:self.count])
+
+    def cull(self, limit=1.1):
+        """Drop obstacles that went past the ground (with a little margin), keeping order"""
+        self.index.cull(limit)
+        n = self.count
+        keep = self.world_y[:n] <= limit
+        kept = int(np.count_nonzero(keep))
+        if kept == n:
+            return
+        for name in ('world_x', 'road_y', 'world_y', 'height', 'lane'):
+            column = getattr(self, name)
+            column[:kept] = column[:n][keep]
+        self.count = kept
 
 # ---------------------------
 # Draw Background Function
 # ---------------------------
-def draw_background(surface, road_offset=0):
+def draw_background(surface, road_offset=0, num_dashes=ROAD_DASHES):
+    # The road fills the whole surface, whatever its resolution
+    width, height = surface.get_size()
+
     # Draw the sky
     surface.fill(SKY_BLUE)
     
     # Draw the road as a trapezoid to simulate perspective
     # Extend the road polygon to fill more space
-    left_bottom = (SCREEN_WIDTH * 0.1, SCREEN_HEIGHT)  # Extend bottom to screen edge
-    right_bottom = (SCREEN_WIDTH * 0.9, SCREEN_HEIGHT)  # Extend bottom to screen edge
-    left_top = (SCREEN_WIDTH * 0.4, 0)  # Extend top to screen edge
-    right_top = (SCREEN_WIDTH * 0.6, 0)  # Extend top to screen edge
+    left_bottom = (width * 0.1, height)  # Extend bottom to screen edge
+    right_bottom = (width * 0.9, height)  # Extend bottom to screen edge
+    left_top = (width * 0.4, 0)  # Extend top to screen edge
+    right_top = (width * 0.6, 0)  # Extend top to screen edge
     road_polygon = [left_bottom, right_bottom, right_top, left_top]
     pygame.draw.polygon(surface, GRAY, road_polygon)
     
     # Draw lane dividers with perspective
     lane_color = WHITE
-    num_dashes = 40  # Increase number of dashes for smoother animation
+    line_width = lane_line_width(height)
     
     # Calculate lane positions with perspective
     for i in range(num_dashes):
@@ -235,15 +431,15 @@ def draw_background(surface, road_offset=0):
         perspective = (i / num_dashes + road_offset) % 1.0
         
         # Calculate start and end points of current dash
-        y1 = 0 + (SCREEN_HEIGHT - 0) * perspective
-        y2 = 0 + (SCREEN_HEIGHT - 0) * (perspective + 0.5/num_dashes)
+        y1 = 0 + (height - 0) * perspective
+        y2 = 0 + (height - 0) * (perspective + 0.5/num_dashes)
         
         # Outer lines (original road boundaries)
-        left_outer_x1 = SCREEN_WIDTH * (0.4 + (0.1 - 0.4) * perspective)
-        left_outer_x2 = SCREEN_WIDTH * (0.4 + (0.1 - 0.4) * (perspective + 0.5/num_dashes))
+        left_outer_x1 = width * (0.4 + (0.1 - 0.4) * perspective)
+        left_outer_x2 = width * (0.4 + (0.1 - 0.4) * (perspective + 0.5/num_dashes))
         
-        right_outer_x1 = SCREEN_WIDTH * (0.6 + (0.9 - 0.6) * perspective)
-        right_outer_x2 = SCREEN_WIDTH * (0.6 + (0.9 - 0.6) * (perspective + 0.5/num_dashes))
+        right_outer_x1 = width * (0.6 + (0.9 - 0.6) * perspective)
+        right_outer_x2 = width * (0.6 + (0.9 - 0.6) * (perspective + 0.5/num_dashes))
         
         # Calculate the total width at each point
         bottom_width = right_outer_x1 - left_outer_x1
@@ -257,10 +453,550 @@ def draw_background(surface, road_offset=0):
         
         # Draw the dashed lines
         if i % 2 == 0:  # Only draw every other segment for dashed effect (1:1 ratio)
-            pygame.draw.line(surface, lane_color, (left_outer_x1, y1), (left_outer_x2, y2), 2)
-            pygame.draw.line(surface, lane_color, (left_inner_x1, y1), (left_inner_x2, y2), 2)
-            pygame.draw.line(surface, lane_color, (right_inner_x1, y1), (right_inner_x2, y2), 2)
-            pygame.draw.line(surface, lane_color, (right_outer_x1, y1), (right_outer_x2, y2), 2)
+            pygame.draw.line(surface, lane_color, (left_outer_x1, y1), (left_outer_x2, y2), line_width)
+            pygame.draw.line(surface, lane_color, (left_inner_x1, y1), (left_inner_x2, y2), line_width)
+            pygame.draw.line(surface, lane_color, (right_inner_x1, y1), (right_inner_x2, y2), line_width)
+            pygame.draw.line(surface, lane_color, (right_outer_x1, y1), (right_outer_x2, y2), line_width)
+
+def lane_line_width(height):
+    """Lane lines are 2px wide at the logical resolution"""
+    return max(1, round(2 * height / SCREEN_HEIGHT))
+
+class BackgroundCache:
+    """
+    Pre-rendered road frames so each gameplay frame blits one Surface instead of
+    rasterizing the road and its lane lines. Only every other dash is drawn, so the
+    road repeats every 2 / num_dashes of road_offset; that period is split into
+    phases sized to the road speed and rendered lazily on first use.
+    """
+    def __init__(self, size=None, max_bytes=None, num_dashes=ROAD_DASHES, phases_per_step=BACKGROUND_PHASES_PER_STEP):
+        self.size = size or viewport.size
+        if max_bytes is None:
+            # Rendering above the logical resolution gets a budget for as many frames
+            max_bytes = int(BACKGROUND_CACHE_BUDGET * max(1.0, viewport.scale ** 2))
+        self.num_dashes = num_dashes
+        self.PERIOD = 2 / num_dashes
+        self.phases_per_step = phases_per_step
+        self.max_frames = max(1, max_bytes // (self.size[0] * self.size[1] * 4))
+        self.num_phases = 1
+        self.frames = {}  # phase index -> Surface
+
+    def phases_for_speed(self, speed):
+        """Number of cached phases so the road moves phases_per_step phases per frame"""
+        phases = math.ceil(self.PERIOD / speed * self.phases_per_step)
+        # With fewer than 3 phases the lane lines would flicker instead of moving forward
+        return max(min(3, self.max_frames), min(phases, self.max_frames))
+
+    def set_speed(self, speed):
+        num_phases = self.phases_for_speed(speed)
+        if num_phases != self.num_phases:
+            self.evict()
+            self.num_phases = num_phases
+
+    def evict(self):
+        """Free every cached frame but phase 0, the static road for every phase count"""
+        self.frames = {0: self.frames[0]} if 0 in self.frames else {}
+
+    def phase(self, road_offset=0):
+        """Index of the cached frame used for road_offset"""
+        return round((road_offset % self.PERIOD) / self.PERIOD * self.num_phases) % self.num_phases
+
+    def get(self, road_offset=0):
+        phase = self.phase(road_offset)
+        frame = self.frames.get(phase)
+        if frame is None:
+            frame = pygame.Surface(self.size)
+            if pygame.display.get_surface() is not None:
+                frame = frame.convert()
+            draw_background(frame, phase * self.PERIOD / self.num_phases, self.num_dashes)
+            self.frames[phase] = frame
+        return frame
+
+    def prerender(self):
+        """Render every phase up front instead of on first use"""
+        for phase in range(self.num_phases):
+            self.get(phase * self.PERIOD / self.num_phases)
+
+    def draw(self, surface, road_offset=0):
+        surface.blit(self.get(road_offset), (0, 0))
+
+# ---------------------------
+# Text Cache
+# ---------------------------
+class TextCache:
+    """
+    LRU cache of rendered text Surfaces keyed by (text, color, font). Numbers are
+    drawn from cached per-digit glyphs so a changing score never misses the cache.
+    """
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (text, color, font)
+        text_surface = self.entries.get(key)
+        if text_surface is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return text_surface
+
+        self.misses += 1
+        text_surface = font.render(text, True, color)
+        self.entries[key] = text_surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Evict the least recently used
+        return text_surface
+
+    def draw_text(self, surface, font, text, color, **anchor):
+        """Blit cached text positioned like Surface.get_rect(**anchor) and return its rect"""
+        text_surface = self.render(font, text, color)
+        text_rect = text_surface.get_rect(**anchor)
+        surface.blit(text_surface, text_rect)
+        return text_rect
+
+    def draw_number(self, surface, font, label, value, color, **anchor):
+        """Blit a cached label followed by per-digit glyphs, e.g. "Score: " + "1" "2" """
+        glyphs = [self.render(font, label, color)]
+        glyphs += [self.render(font, digit, color) for digit in str(value)]
+        text_rect = pygame.Rect(0, 0, sum(g.get_width() for g in glyphs), max(g.get_height() for g in glyphs))
+        for name, value in anchor.items():
+            setattr(text_rect, name, value)
+        x = text_rect.x
+        for glyph in glyphs:
+            surface.blit(glyph, (x, text_rect.y))
+            x += glyph.get_width()
+        return text_rect
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries)
+        }
+
+text_cache = TextCache()
+
+# ---------------------------
+# Projection Table & Sprite Cache
+# ---------------------------
+class ProjectionTable:
+    """
+    project() precomputed over quantized world_y, for drawing. Collision keeps using
+    the exact project() so gameplay does not depend on the table resolution.
+    resolution scales the output from the logical resolution to the surface drawn on.
+    """
+    def __init__(self, min_y=-0.2, max_y=1.2, steps_per_unit=PROJECTION_STEPS, resolution=1.0):
+        # Entries sit on multiples of 1 / steps_per_unit so the horizon and ground are exact
+        self.steps_per_unit = steps_per_unit
+        self.first = math.floor(min_y * steps_per_unit)
+        self.world_y = np.arange(self.first, math.ceil(max_y * steps_per_unit) + 1) / steps_per_unit
+        self.set_resolution(resolution)
+
+    def set_resolution(self, resolution):
+        self.resolution = resolution
+        self.center_x = SCREEN_WIDTH / 2 * resolution
+        self.scale = (0.5 + 0.5 * self.world_y) * resolution
+        self.screen_y = (HORIZON + (GROUND_Y - HORIZON) * self.world_y) * resolution
+        # Plain lists for the scalar path, indexing them is cheaper than NumPy scalars
+        self.scale_list = self.scale.tolist()
+        self.screen_y_list = self.screen_y.tolist()
+
+    def index(self, world_y):
+        i = math.floor(world_y * self.steps_per_unit + 0.5) - self.first
+        return min(max(i, 0), len(self.scale_list) - 1)
+
+    def project(self, world_x, world_y, jump_offset=0):
+        """Table-driven project() for a single entity"""
+        i = self.index(world_y)
+        scale = self.scale_list[i]
+        return (int(self.center_x + world_x * scale),
+                int(self.screen_y_list[i] - jump_offset * self.resolution), scale)
+
+    def project_rects(self, world_x, world_y, base_width, base_height):
+        """Screen rects (x, y, width, height) for arrays of entities standing on the road"""
+        i = np.floor(world_y * self.steps_per_unit + 0.5).astype(np.int64) - self.first
+        np.clip(i, 0, len(self.scale) - 1, out=i)
+        scale = self.scale[i]
+        screen_x = (self.center_x + world_x * scale).astype(np.int64)
+        draw_width = (base_width * scale).astype(np.int64)
+        draw_height = (base_height * scale).astype(np.int64)
+        return (screen_x - draw_width // 2, self.screen_y[i].astype(np.int64) - draw_height,
+                draw_width, draw_height)
+
+class SpriteCache:
+    """
+    Pre-scaled entity Surfaces keyed by (shape, color, width, height). Entities only
+    take a few dozen pixel sizes between the horizon and the ground, so every
+    entity can be drawn from this cache in one Surface.blits call.
+    """
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, shape, color, width, height):
+        key = (shape, color, width, height)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            if shape == 'rect':
+                sprite = pygame.Surface((width, height))
+                sprite.fill(color)
+            else:  # 'ellipse'
+                sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+                pygame.draw.ellipse(sprite, color, sprite.get_rect())
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha() if shape == 'ellipse' else sprite.convert()
+            self.sprites[key] = sprite
+        return sprite
+
+projection_table = ProjectionTable()
+sprite_cache = SpriteCache()
+
+def obstacle_blit_items(world_x, world_y, base_width=50, base_height=50, color=RED, table=projection_table):
+    """(sprite, position) pairs for arrays of obstacle positions, for Surface.blits"""
+    x, y, width, height = table.project_rects(world_x, world_y, base_width, base_height)
+    return [(sprite_cache.get('rect', color, w, h), (sx, sy))
+            for sx, sy, w, h in zip(x.tolist(), y.tolist(), width.tolist(), height.tolist())]
+
+def player_blit_items(world_x, world_y, height, color, width=50, base_height=80,
+                      table=projection_table, shadow=True):
+    """(sprite, position) pairs matching Player.draw(), for Surface.blits"""
+    screen_x, screen_y, scale = table.project(world_x, world_y, height)
+    draw_width = int(width * scale)
+    draw_height = int(base_height * scale)
+    items = []
+
+    # Shadow (only when jumping)
+    if shadow and height > 0:
+        shadow_scale = 1.0 - (height / 100)
+        shadow_radius = int(draw_width * 0.4 * shadow_scale)
+        if shadow_radius > 0:
+            shadow_sprite = sprite_cache.get('ellipse', (200, 200, 200), shadow_radius * 2, shadow_radius)
+            items.append((shadow_sprite, (screen_x - shadow_radius, screen_y - shadow_radius // 2)))
+
+    body = sprite_cache.get('rect', color, draw_width, draw_height)
+    items.append((body, (screen_x - draw_width // 2, screen_y - draw_height)))
+    return items
+
+def entity_blit_items(snapshot, table=projection_table, shadow=True):
+    """(sprite, position) pairs for every obstacle, then the player's shadow and body"""
+    items = obstacle_blit_items(snapshot.obstacle_x, snapshot.obstacle_y, table=table)
+    items.extend(player_blit_items(snapshot.player_x, snapshot.player_y, snapshot.player_height,
+                                   snapshot.player_color, *snapshot.player_size, table=table, shadow=shadow))
+    return items
+
+def draw_entities(surface, snapshot, table=projection_table, shadow=True):
+    """Draw every obstacle, then the player's shadow and body, in one blits call"""
+    surface.blits(entity_blit_items(snapshot, table, shadow), doreturn=False)
+
+# ---------------------------
+# Frame Profiler
+# ---------------------------
+class FrameProfiler:
+    """
+    Per-phase frame timings in a fixed-size ring buffer. Call begin_frame(), then
+    mark(phase) at the end of each phase (time since the previous mark is charged
+    to that phase), then end_frame(). While disabled, mark() returns immediately,
+    and marks from other threads than the one that began the frame are ignored.
+    """
+    def __init__(self, phases=PROFILE_PHASES, capacity=PROFILE_FRAMES):
+        self.phases = list(phases)
+        self.columns = {phase: i for i, phase in enumerate(self.phases)}
+        self.capacity = capacity
+        self.timings = np.zeros((capacity, len(self.phases) + 1))  # Last column is the frame total
+        self.frames = 0  # Frames recorded so far (the ring position is frames % capacity)
+        self.enabled = False
+        self.row = [0.0] * len(self.phases)
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.thread = threading.get_ident()  # Thread whose frames are being timed
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.thread = threading.get_ident()
+        self.row = [0.0] * len(self.phases)
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled or threading.get_ident() != self.thread:
+            return
+        now = time.perf_counter()
+        self.row[self.columns[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        row = self.timings[self.frames % self.capacity]
+        row[:-1] = self.row
+        row[-1] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames += 1
+
+    def recent(self):
+        """Recorded rows, oldest first"""
+        if self.frames <= self.capacity:
+            return self.timings[:self.frames]
+        start = self.frames % self.capacity
+        return np.concatenate((self.timings[start:], self.timings[:start]))
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """{phase: [p50, p95, p99]} in milliseconds, including 'total'"""
+        rows = self.recent()
+        if len(rows) == 0:
+            return {}
+        values = np.percentile(rows, quantiles, axis=0)
+        return {name: values[:, i].tolist() for i, name in enumerate(self.phases + ['total'])}
+
+    def dump_csv(self, path):
+        with open(path, 'w') as f:
+            f.write(','.join(['frame'] + self.phases + ['total']) + '\n')
+            first = max(0, self.frames - self.capacity)
+            for i, row in enumerate(self.recent()):
+                f.write(','.join([str(first + i)] + [f"{value:.4f}" for value in row]) + '\n')
+
+profiler = FrameProfiler()
+
+def draw_profiler_overlay(surface, font, stats, extra_rows=None, status=()):
+    """
+    Per-phase p50/p95/p99 table and a frame-time graph in the bottom left corner.
+    extra_rows maps more row labels to their p50/p95/p99 and status holds lines of
+    text drawn under the table; returns the panel rect.
+    """
+    extra_rows = extra_rows or {}
+    extra_height = 16 * (len(extra_rows) + len(status))
+    panel = pygame.Rect(10, surface.get_height() - 300 - extra_height, 320, 290 + extra_height)
+    pygame.draw.rect(surface, (20, 20, 20), panel)
+    columns = [panel.x + 160, panel.x + 220, panel.x + 280]  # Right edges of p50, p95, p99
+    text_cache.draw_text(surface, font, "phase (ms)", WHITE, topleft=(panel.x + 6, panel.y + 4))
+    for label, right in zip(("p50", "p95", "p99"), columns):
+        text_cache.draw_text(surface, font, label, WHITE, topright=(right, panel.y + 4))
+    y = panel.y + 22
+    for phase in profiler.phases + ['total']:
+        text_cache.draw_text(surface, font, phase, WHITE, topleft=(panel.x + 6, y))
+        for value, right in zip(stats.get(phase, (0.0, 0.0, 0.0)), columns):
+            text_cache.draw_text(surface, font, f"{value:.2f}", WHITE, topright=(right, y))
+        y += 16
+    for label, values in extra_rows.items():
+        text_cache.draw_text(surface, font, label, WHITE, topleft=(panel.x + 6, y))
+        for value, right in zip(values, columns):
+            text_cache.draw_text(surface, font, f"{value:.1f}", WHITE, topright=(right, y))
+        y += 16
+    for line in status:
+        text_cache.draw_text(surface, font, line, WHITE, topleft=(panel.x + 6, y))
+        y += 16
+
+    # Frame-time graph of the last frames, with the 1000 / FPS budget line
+    graph = pygame.Rect(panel.x + 6, y + 6, panel.width - 12, panel.bottom - y - 12)
+    budget_ms = 1000 / (FPS or TICK_RATE)
+    ms_per_pixel = budget_ms * 2 / graph.height
+    totals = profiler.recent()[-graph.width:, -1].tolist()
+    for x, total in enumerate(totals):
+        bar = min(graph.height, int(total / ms_per_pixel))
+        color = (80, 200, 80) if total <= budget_ms else (220, 80, 80)
+        pygame.draw.line(surface, color, (graph.x + x, graph.bottom), (graph.x + x, graph.bottom - bar))
+    budget_y = graph.bottom - int(budget_ms / ms_per_pixel)
+    pygame.draw.line(surface, (200, 200, 200), (graph.x, budget_y), (graph.right, budget_y))
+    return panel
+
+# ---------------------------
+# Dirty Rect Rendering
+# ---------------------------
+def lane_line_rects(size, num_dashes=ROAD_DASHES, strip_height=DIRTY_STRIP_HEIGHT):
+    """
+    Rects covering the four lane lines on a road drawn at size, cut into horizontal
+    strips so each rect hugs its slanted line. Together they hold every pixel that
+    changes when the road moves.
+    """
+    width, height = size
+
+    def line_xs(perspective):
+        left = width * (0.4 + (0.1 - 0.4) * perspective)
+        right = width * (0.6 + (0.9 - 0.6) * perspective)
+        road_width = right - left
+        return (left, left + road_width / 3, right - road_width / 3, right)
+
+    # Lines have a width, and inner dashes are offset by the road width at their start
+    # so they lean out by up to a dash's worth of road widening
+    margin = lane_line_width(height) + math.ceil(width * (0.9 - 0.6) * 2 / 3 * 0.5 / num_dashes)
+    rects = []
+    for top in range(0, height, strip_height):
+        bottom = min(top + strip_height, height)
+        for x1, x2 in zip(line_xs(top / height), line_xs(bottom / height)):
+            left = math.floor(min(x1, x2)) - margin
+            right = math.ceil(max(x1, x2)) + margin
+            rects.append(pygame.Rect(left, top, right - left, bottom - top))
+    return rects
+
+class DirtyRectRenderer:
+    """
+    Gameplay renderer that only repaints what changed. The sky, road and HUD labels
+    stay on screen between frames; each frame restores the lane-line strips (when the
+    road phase changed), the entities' previous rects and any HUD text that changed
+    from the cached background, draws on top and returns the rects to push with
+    pygame.display.update. Pixels pushed per frame are kept for the profiler overlay.
+    """
+    def __init__(self, background, shadow=True, history=PROFILE_FRAMES):
+        self.background = background
+        self.shadow = shadow
+        self.road_rects = lane_line_rects(background.size, background.num_dashes)
+        self.pixels = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """Repaint the whole screen on the next frame (new game, window exposed)"""
+        self.full = True
+        self.phase = None
+        self.entity_rects = []
+        self.hud = {}  # label -> (value, rect) last drawn
+
+    def hud_items(self, snapshot, high_score):
+        """(label, value, color, topleft) of each HUD text, as drawn by draw_game"""
+        return [
+            ("Difficulty: ", snapshot.difficulty, (200, 200, 200), viewport.point(10, 10)),
+            ("Score: ", int(snapshot.score // 1000), BLACK, viewport.point(SCREEN_WIDTH - 200, 10)),
+            ("Best: ", int(high_score // 1000), BLACK, viewport.point(SCREEN_WIDTH - 200, 40))
+        ]
+
+    def draw(self, surface, font, snapshot, high_score):
+        """Draw one gameplay frame and return the rects that changed"""
+        frame = self.background.get(snapshot.road_offset)
+        phase = self.background.phase(snapshot.road_offset)
+        items = entity_blit_items(snapshot, shadow=self.shadow)
+        entity_rects = [sprite.get_rect(topleft=position) for sprite, position in items]
+
+        if self.full:
+            surface.blit(frame, (0, 0))
+            restored = [surface.get_rect()]
+        else:
+            restored = list(self.entity_rects)
+            if phase != self.phase:
+                restored.extend(self.road_rects)
+        # HUD text is redrawn when its value changed or something is drawn under it
+        hud = []
+        for label, value, color, topleft in self.hud_items(snapshot, high_score):
+            drawn = self.hud.get(label)
+            if (self.full or drawn is None or drawn[0] != value
+                    or drawn[1].collidelist(restored) != -1 or drawn[1].collidelist(entity_rects) != -1):
+                if drawn is not None and not self.full:
+                    restored.append(drawn[1])
+                hud.append((label, value, color, topleft))
+        if not self.full:
+            for rect in restored:
+                surface.blit(frame, rect, rect)
+        profiler.mark('background')
+
+        surface.blits(items, doreturn=False)
+        profiler.mark('entities')
+
+        dirty = restored + entity_rects
+        for label, value, color, topleft in hud:
+            if isinstance(value, int):
+                rect = text_cache.draw_number(surface, font, label, value, color, topleft=topleft)
+            else:
+                rect = text_cache.draw_text(surface, font, label + value, color, topleft=topleft)
+            self.hud[label] = (value, rect)
+            dirty.append(rect)
+
+        self.full = False
+        self.phase = phase
+        self.entity_rects = entity_rects
+        screen_rect = surface.get_rect()
+        self.pixels.append(sum(rect.clip(screen_rect).width * rect.clip(screen_rect).height for rect in dirty))
+        return dirty
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """p50/p95/p99 of pixels pushed per frame, in thousands"""
+        if not self.pixels:
+            return [0.0] * len(quantiles)
+        return (np.percentile(np.fromiter(self.pixels, dtype=np.float64), quantiles) / 1000).tolist()
+
+# ---------------------------
+# Quality Governor
+# ---------------------------
+class QualityView:
+    """
+    Background cache and renderer for one quality level. A level's resolution is
+    applied by main() through set_render_scale, so views are rebuilt when it changes.
+    """
+    def __init__(self, settings, dirty_rects=True, background=None):
+        self.settings = settings
+        self.background = background or BackgroundCache(phases_per_step=settings['road_phases'])
+        self.renderer = DirtyRectRenderer(self.background, settings['shadow']) if dirty_rects else None
+
+    def reset(self):
+        """Repaint everything on the next frame"""
+        if self.renderer is not None:
+            self.renderer.reset()
+
+    def draw(self, surface, font, snapshot, high_score):
+        """Draw one gameplay frame; returns the rects to update, or None to flip"""
+        if self.renderer is not None:
+            return self.renderer.draw(surface, font, snapshot, high_score)
+        draw_game(surface, font, snapshot, high_score, self.background, self.settings['shadow'])
+        return None
+
+class QualityGovernor:
+    """
+    Picks a QUALITY_LEVELS entry from recent frame times. Frame times are the work
+    done per frame (clock.get_rawtime() after clock.tick, without the frame cap's
+    sleep). Once QUALITY_WINDOW frames are measured at a level, it steps down if the
+    p90 is over QUALITY_STEP_DOWN of the frame budget, or up if it is under
+    QUALITY_STEP_UP. A level that is stepped up to and straight back down from
+    waits twice as long before the next try. Each change is kept in history.
+    """
+    def __init__(self, budget_ms=1000 / (FPS or TICK_RATE), level=0, window=QUALITY_WINDOW):
+        self.budget_ms = budget_ms
+        self.level = level
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+        self.changed_at = 0  # Frame of the last level change
+        self.stepped_up = False  # Whether the last change was a step up
+        self.up_delay = window  # Frames to wait at a level before stepping up
+        self.history = []  # One dict per level change
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    def restart(self):
+        """Forget frame times measured before a pause (menus, loading)"""
+        self.frame_times.clear()
+
+    def update(self, frame_ms):
+        """Record one frame's work time; returns True when the level changed"""
+        self.frames += 1
+        self.frame_times.append(frame_ms)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return False
+        p90 = float(np.percentile(np.fromiter(self.frame_times, dtype=np.float64), 90))
+        if p90 > self.budget_ms * QUALITY_STEP_DOWN and self.level < len(QUALITY_LEVELS) - 1:
+            if self.stepped_up and self.frames - self.changed_at <= 2 * self.frame_times.maxlen:
+                # The level we just stepped up to was too slow, try it again later
+                self.up_delay = min(self.up_delay * 2, QUALITY_MAX_UP_DELAY)
+            self.set_level(self.level + 1, p90)
+            self.stepped_up = False
+        elif (p90 < self.budget_ms * QUALITY_STEP_UP and self.level > 0
+              and self.frames - self.changed_at >= self.up_delay):
+            self.set_level(self.level - 1, p90)
+            self.stepped_up = True
+        else:
+            return False
+        return True
+
+    def set_level(self, level, p90_ms=None):
+        self.history.append({
+            'frame': self.frames,
+            'time': time.time(),
+            'from': QUALITY_LEVELS[self.level]['name'],
+            'to': QUALITY_LEVELS[level]['name'],
+            'p90_ms': p90_ms
+        })
+        self.level = level
+        self.changed_at = self.frames
+        self.frame_times.clear()
 
 # ---------------------------
 # Collision Detection
@@ -276,6 +1012,672 @@ def check_collision(player_rect, player_height, obs_rect, obs_height):
     # Use the obstacle's hitbox for collision
     return player_rect.colliderect(obs_rect)
 
+def obstacle_hitbox(world_x, world_y, base_width=50, base_height=50):
+    """Screen-space hitbox (top 10%) of an obstacle at the given world position"""
+    screen_x, screen_y, scale = project(world_x, world_y)
+    draw_width = int(base_width * scale)
+    draw_height = int(base_height * scale)
+    return pygame.Rect(
+        screen_x - draw_width // 2,
+        screen_y - draw_height,
+        draw_width,
+        int(draw_height * 0.1)
+    )
+
+class CollisionIndex:
+    """
+    Collision broadphase in world space. Obstacles are bucketed by lane, each bucket
+    ordered by distance down the road, so a query only walks the lanes the player
+    can reach and stops at the band of world_y where a hitbox can touch the player
+    (world_y = 1). The cost does not depend on the lane count or on how many
+    obstacles are further up the road.
+    """
+    def __init__(self, lanes=LANES, base_width=50, base_height=50, player_width=50, player_height=80, margin=2):
+        self.lanes = list(lanes)
+        self.base_width = base_width
+        self.base_height = base_height
+        self.buckets = [deque() for _ in self.lanes]  # per lane: [road_y, height] oldest first
+        self.spawn_order = deque()  # lane of every live obstacle, oldest first
+        self.travelled = 0.0  # Total advance; an obstacle's world_y is road_y + travelled
+
+        # An obstacle's top edge is roughly linear in world_y:
+        #   top = HORIZON + (GROUND_Y - HORIZON) * w - base_height * (0.5 + 0.5 * w)
+        a = HORIZON - base_height * 0.5
+        b = (GROUND_Y - HORIZON) - base_height * 0.5
+        player_top = GROUND_Y - player_height
+        self.band_min = (player_top - base_height * 0.1 - margin - a) / b
+        self.band_max = (GROUND_Y + margin - a) / b
+
+        # Horizontal reach from the player's centre to an overlapping obstacle centre
+        self.scale_min = 0.5 + 0.5 * self.band_min
+        self.scale_max = 0.5 + 0.5 * self.band_max
+        self.reach = player_width / 2 + base_width * self.scale_max / 2 + margin
+
+    def add(self, lane, world_y, height):
+        # Obstacles must be added furthest-first (they all spawn at the same world_y)
+        self.buckets[lane].append((world_y - self.travelled, height))
+        self.spawn_order.append(lane)
+
+    def advance(self, speed):
+        self.travelled += speed
+
+    def cull(self, limit=1.1):
+        # Every obstacle moves at the same speed, so the oldest ones are always culled first
+        while self.spawn_order:
+            bucket = self.buckets[self.spawn_order[0]]
+            if bucket[0][0] + self.travelled <= limit:
+                break
+            bucket.popleft()
+            self.spawn_order.popleft()
+
+    def candidate_lanes(self, world_x):
+        """Range of lane indices whose obstacles can overlap a player at world_x"""
+        bounds = [(world_x + offset) / scale for offset in (-self.reach, self.reach)
+                  for scale in (self.scale_min, self.scale_max)]
+        return range(bisect_left(self.lanes, min(bounds)), bisect_right(self.lanes, max(bounds)))
+
+    def candidates(self, world_x):
+        """Yield (world_x, world_y, height) of obstacles that could touch the player"""
+        for lane in self.candidate_lanes(world_x):
+            for road_y, height in self.buckets[lane]:
+                world_y = road_y + self.travelled
+                if world_y > self.band_max:
+                    continue
+                if world_y < self.band_min:
+                    break  # The rest of this lane is further up the road
+                yield self.lanes[lane], world_y, height
+
+    def collides(self, player):
+        """Narrowphase the candidates against the player's hitbox"""
+        player_rect, player_height = player.get_hitbox()
+        if player_height > 0:
+            return False  # Invulnerable while jumping, no need to look
+        for world_x, world_y, height in self.candidates(player.world_x):
+            obs_rect = obstacle_hitbox(world_x, world_y, self.base_width, self.base_height)
+            if check_collision(player_rect, player_height, obs_rect, height):
+                return True
+        return False
+
+# ---------------------------
+# Obstacle Patterns
+# ---------------------------
+# Group size weights for each obstacle spawn (1, 2 or 3 obstacles)
+SPAWN_WEIGHTS = {
+    'EASY': [0.8, 0.2, 0.0],    # Mostly single obstacles
+    'MEDIUM': [0.6, 0.3, 0.1],  # Some doubles, rare triples
+    'HARD': [0.4, 0.4, 0.2]     # More doubles and triples
+}
+
+def spawn_ticks(interval):
+    """Ticks between two spawns interval milliseconds apart (the spawn timer resets on spawn)"""
+    return int(interval // TICK_MS) + 1
+
+def jump_airtime(player):
+    """Ticks a player stays off the ground (and so invulnerable) after jumping"""
+    player.jump()
+    ticks = 0
+    while True:
+        player.update()
+        if player.height <= 0:
+            return ticks
+        ticks += 1
+
+def lane_change_ticks(player, clearance):
+    """Ticks for a player to get further than clearance from the lane it is leaving"""
+    spacing = player.LANES[1] - player.LANES[0]
+    distance, ticks = spacing, 0  # Distance left to the target lane
+    while spacing - distance < clearance:
+        distance -= distance * player.transition_speed
+        ticks += 1
+    return ticks
+
+class ObstacleChunk:
+    """One obstacle spawn: (lane, height) pairs and the milliseconds until the next spawn"""
+    __slots__ = ('obstacles', 'interval')
+
+    def __init__(self, obstacles, interval):
+        self.obstacles = obstacles
+        self.interval = interval
+
+class PatternGenerator:
+    """
+    Streams obstacle chunks, generated up to PATTERN_LOOKAHEAD_MS ahead into a ring
+    buffer so spawning only copies pre-rolled lanes and heights. Each new chunk is
+    checked for a way through given the difficulty's jump airtime and lane-change
+    speed: walls (every lane blocked) must be jumpable and open lanes reachable in
+    time. Chunks that fail are rerolled, then thinned until passable.
+    """
+    def __init__(self, difficulty='MEDIUM', rng=random, lookahead_ms=PATTERN_LOOKAHEAD_MS):
+        self.difficulty = difficulty
+        self.rng = rng
+        self.lookahead_ms = lookahead_ms
+        self.num_lanes = len(LANES)
+        self.weights = SPAWN_WEIGHTS[difficulty]
+        self.base_interval = DIFFICULTIES[difficulty]['interval']
+
+        # What the player can do at this difficulty, in ticks
+        probe = Player(BLUE, difficulty)
+        index = CollisionIndex(LANES)
+        speed = DIFFICULTIES[difficulty]['speed']
+        self.airtime = jump_airtime(probe)
+        self.lane_ticks = lane_change_ticks(Player(BLUE, difficulty), index.reach)
+        self.window = math.ceil((index.band_max - index.band_min) / speed)  # Ticks a chunk can hit the player
+
+        # Possible player states after the chunks generated so far: (lane, landing tick),
+        # with ticks relative to when the newest chunk reaches the player
+        self.floor = self.window - self.airtime - 1  # Landing earlier than this no longer matters
+        self.states = {(self.num_lanes // 2, self.floor)}
+        self.gap = spawn_ticks(self.base_interval)  # Ticks until the next chunk reaches the player
+
+        self.buffer = deque()
+        self.buffered_ms = 0.0
+        self.fill()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        chunk = self.buffer.popleft()
+        self.buffered_ms -= chunk.interval
+        self.fill()
+        return chunk
+
+    def fill(self):
+        """Generate chunks until the buffer covers the lookahead window"""
+        while self.buffered_ms < self.lookahead_ms or not self.buffer:
+            chunk = self._generate()
+            self.buffer.append(chunk)
+            self.buffered_ms += chunk.interval
+
+    def _roll(self):
+        # Each obstacle rolls its own lane, like Obstacle does, so groups may share a lane
+        num_obstacles = self.rng.choices([1, 2, 3], weights=self.weights)[0]
+        return [(self.rng.randrange(self.num_lanes), self.rng.choice([0, 50])) for _ in range(num_obstacles)]
+
+    def _generate(self):
+        obstacles = self._roll()
+        states = self.passable(obstacles)
+        for _ in range(PATTERN_REROLLS):
+            if states:
+                break
+            obstacles = self._roll()
+            states = self.passable(obstacles)
+        while not states:
+            obstacles.pop(self.rng.randrange(len(obstacles)))  # An empty chunk is always passable
+            states = self.passable(obstacles)
+
+        interval = self.base_interval * self.rng.uniform(0.8, 1.2)
+        self.gap = spawn_ticks(interval)
+        self.states = {(lane, max(land - self.gap, self.floor)) for lane, land in states}
+        return ObstacleChunk(obstacles, interval)
+
+    def passable(self, obstacles):
+        """Player states that get past a chunk arriving self.gap ticks after the previous one"""
+        blocked = {lane for lane, _ in obstacles}
+        slack = PATTERN_SLACK_TICKS
+        move_ticks = self.gap - self.window - slack  # Time to change lanes after the previous chunk
+        result = set()
+        for lane, land in self.states:
+            for target in range(self.num_lanes):
+                if abs(target - lane) * self.lane_ticks > move_ticks:
+                    continue
+                if target not in blocked:
+                    result.add((target, land))
+                    continue
+                # Blocked lane: be in the air for the whole window [0, window]
+                if land - self.airtime <= -slack and land >= self.window + slack:
+                    result.add((target, land))  # Still airborne from an earlier jump
+                earliest = max(land, self.window + slack - self.airtime)
+                if earliest <= -slack:
+                    result.add((target, earliest + self.airtime))  # Jump as early as possible
+                    result.add((target, -slack + self.airtime))    # Or as late as possible
+        return result
+
+# ---------------------------
+# Game Simulation
+# ---------------------------
+def read_inputs(keys, pressed):
+    """
+    Build the input dict consumed by GameSimulation.step from pygame key state.
+    pressed holds keys that went down since the last tick, so taps shorter than a
+    tick still register.
+    """
+    return {
+        'a': bool(keys[pygame.K_a]) or pressed['a'],
+        'd': bool(keys[pygame.K_d]) or pressed['d'],
+        'jump': pressed['jump']
+    }
+
+class GameSimulation:
+    """
+    Headless state for a single run: player, obstacles, spawn timer, score and road offset.
+    step() never touches a display surface, so it can be driven by main() or run
+    thousands of ticks per second for testing and tuning.
+    """
+    def __init__(self, color=BLUE, difficulty='MEDIUM', seed=None):
+        # Every run is seeded (randomly if no seed is given) so it can be replayed
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.difficulty = difficulty
+        self.player = Player(color, difficulty)
+        self.obstacles = ObstacleField()
+        self.obstacle_timer = 0
+        self.obstacle_interval = DIFFICULTIES[difficulty]['interval']  # in milliseconds between obstacle spawns
+        self.patterns = PatternGenerator(difficulty, self.rng)
+        self.score = 0
+        self.road_offset = 0.0
+        self.state = "playing"  # "playing" or "game_over"
+        self.speed = DIFFICULTIES[difficulty]['speed']  # World units per tick
+        self.previous = (self.player.world_x, self.player.height, self.road_offset)  # For interpolation
+
+    def step(self, inputs, dt=TICK_MS):
+        """Advance the run by one tick of dt milliseconds and return the new state"""
+        if self.state != "playing":
+            return self.state
+        speed = self.speed = DIFFICULTIES[self.difficulty]['speed']
+        self.previous = (self.player.world_x, self.player.height, self.road_offset)
+
+        # Update player
+        if inputs.get('jump'):
+            self.player.jump()
+        self.player.move(inputs)
+        self.player.update()
+        profiler.mark('player')
+
+        # Update road offset using current difficulty speed
+        self.road_offset += speed
+        if self.road_offset >= 1.0:
+            self.road_offset -= 1.0
+
+        # Update obstacles with the same speed and drop the ones past the ground
+        self.obstacles.advance(speed)
+        self.obstacles.cull()
+        profiler.mark('obstacles')
+
+        self._spawn_obstacles(dt)
+        profiler.mark('spawn')
+
+        # Collision against this frame's hitboxes, via the lane/band broadphase
+        if self.obstacles.index.collides(self.player):
+            self.state = "game_over"
+        profiler.mark('collision')
+
+        self.score += dt
+        return self.state
+
+    def snapshot(self, alpha=1.0):
+        return GameSnapshot(self, alpha)
+
+    def _spawn_obstacles(self, dt):
+        # Spawn the next pre-generated chunk of obstacles
+        self.obstacle_timer += dt
+        if self.obstacle_timer > self.obstacle_interval:
+            self.obstacle_timer = 0
+            chunk = next(self.patterns)
+            for lane, height in chunk.obstacles:
+                self.obstacles.add(LANES[lane], -0.2, height, lane)  # Start above the screen
+            self.obstacle_interval = chunk.interval
+
+class GameSnapshot:
+    """
+    Read-only copy of what the renderer needs from a GameSimulation. alpha in [0, 1]
+    interpolates between the previous and the current tick, so rendering at any
+    frame rate stays smooth while gameplay advances on the fixed timestep.
+    Nothing refers back to the simulation, so a snapshot can be handed to another
+    thread and re-interpolated there with at().
+    """
+    def __init__(self, sim, alpha=1.0):
+        player = sim.player
+        self.difficulty = sim.difficulty
+        self.state = sim.state
+        self.score = sim.score
+        self.player_y = player.world_y
+        self.player_color = player.color
+        self.player_size = (player.width, player.base_height)
+        self.previous = sim.previous
+        self.current = (player.world_x, player.height, sim.road_offset)
+        self.speed = sim.speed
+
+        n = len(sim.obstacles)
+        self.obstacle_x = sim.obstacles.world_x[:n].copy()
+        self.obstacle_tick_y = sim.obstacles.world_y[:n].copy()
+        self._interpolate(alpha)
+
+    def at(self, alpha):
+        """This tick interpolated at another alpha, as a new snapshot"""
+        snapshot = copy.copy(self)
+        snapshot._interpolate(alpha)
+        return snapshot
+
+    def _interpolate(self, alpha):
+        prev_x, prev_height, prev_offset = self.previous
+        world_x, height, road_offset = self.current
+        self.alpha = alpha
+        self.player_x = prev_x + (world_x - prev_x) * alpha
+        self.player_height = max(0, prev_height + (height - prev_height) * alpha)
+        self.road_offset = (prev_offset + ((road_offset - prev_offset) % 1.0) * alpha) % 1.0
+        # Every obstacle moved by the same speed during the last tick
+        self.obstacle_y = self.obstacle_tick_y - self.speed * (1.0 - alpha)
+
+# ---------------------------
+# Simulation Thread
+# ---------------------------
+class SimulationThread:
+    """
+    Runs a GameSimulation on its own thread at tick_rate ticks per second, so a
+    slow flip or font render on the main thread never delays a tick. The main
+    thread passes input in with set_input() and renders latest(). Each tick writes
+    an immutable GameSnapshot into the back slot of a double buffer and then flips
+    which slot is the front one, so the renderer only ever sees finished ticks.
+    """
+    def __init__(self, sim, replay=None, tick_rate=TICK_RATE):
+        self.sim = sim
+        self.replay = replay
+        self.tick_seconds = 1 / tick_rate
+        self.lock = threading.Lock()
+        self.held = {'a': False, 'd': False, 'jump': False}  # Keys down in the latest frame
+        self.pending = dict(self.held)  # Input for the next tick, including taps since the last one
+        self.slots = [(sim.snapshot(), 0, time.perf_counter()), None]  # (snapshot, tick, tick time)
+        self.front = 0
+        self.ticks = 0
+        self.started = self.finished = None
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def set_input(self, held, pressed):
+        """Key state of this frame, and keys that went down since the last frame"""
+        with self.lock:
+            self.held = held
+            for key in self.pending:
+                self.pending[key] = self.pending[key] or held[key] or pressed[key]
+
+    def latest(self):
+        """(snapshot, tick, perf_counter time of the tick) from the front slot"""
+        return self.slots[self.front]
+
+    def tick_rate(self):
+        """Ticks per second simulated so far"""
+        end = self.finished or time.perf_counter()
+        return self.ticks / max(end - self.started, 1e-9)
+
+    def _run(self):
+        next_tick = time.perf_counter() + self.tick_seconds
+        while self.sim.state == "playing" and not self.stopping.is_set():
+            now = time.perf_counter()
+            if now < next_tick:
+                self.stopping.wait(next_tick - now)
+                continue
+            with self.lock:
+                inputs = self.pending
+                self.pending = dict(self.held)
+            if self.replay is not None:
+                self.replay.record(inputs)
+            self.sim.step(inputs, TICK_MS)
+            self.ticks += 1
+            back = 1 - self.front
+            self.slots[back] = (self.sim.snapshot(), self.ticks, now)
+            self.front = back
+            next_tick += self.tick_seconds
+            if now - next_tick > MAX_CATCH_UP_STEPS * self.tick_seconds:
+                # Too far behind (the process was suspended): drop the backlog
+                next_tick = now
+        self.finished = time.perf_counter()
+
+class FramePacing:
+    """
+    Counts how the render loop lines up with simulation ticks: frames that showed
+    the same tick as the frame before (duplicated) and ticks that were never shown
+    because a newer one replaced them first (dropped).
+    """
+    def __init__(self):
+        self.frames = 0
+        self.duplicated = 0
+        self.dropped = 0
+        self.last_tick = None
+        self.started = time.perf_counter()
+
+    def frame(self, tick):
+        self.frames += 1
+        if self.last_tick is not None:
+            if tick == self.last_tick:
+                self.duplicated += 1
+            elif tick > self.last_tick + 1:
+                self.dropped += tick - self.last_tick - 1
+        self.last_tick = tick
+
+    def frame_rate(self):
+        return self.frames / max(time.perf_counter() - self.started, 1e-9)
+
+    def report(self, sim_thread):
+        return (f"sim {sim_thread.tick_rate():.1f} ticks/s, render {self.frame_rate():.1f} fps, "
+                f"{self.dropped} dropped, {self.duplicated} duplicated")
+
+# ---------------------------
+# Startup
+# ---------------------------
+def init_pygame():
+    """Initialize only the pygame modules the game uses (no audio, joystick, ...)"""
+    pygame.display.init()
+    pygame.font.init()
+
+class FontResolver:
+    """
+    Maps font family names to files through an on-disk cache, so the system font scan
+    behind pygame.font.SysFont runs once per machine instead of on every launch.
+    Missing families fall back to the font bundled with pygame.
+    """
+    def __init__(self, cache_path=FONT_CACHE_PATH):
+        self.cache_path = cache_path
+        self.paths = None  # family name -> file path ('' when not installed)
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                self.paths = json.load(f)
+        except (OSError, ValueError):
+            self.paths = {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, 'w') as f:
+                json.dump(self.paths, f)
+        except OSError:
+            pass  # Read-only home: resolve again next launch
+
+    def resolve(self, name):
+        """Path of the font file for a family, or None for pygame's bundled font"""
+        if self.paths is None:
+            self._load()
+        path = self.paths.get(name)
+        if path is None or (path and not os.path.exists(path)):
+            path = pygame.font.match_font(name) or ''
+            self.paths[name] = path
+            self._save()
+        return path or None
+
+    def load(self, name, size):
+        return pygame.font.Font(self.resolve(name), size)
+
+font_resolver = FontResolver()
+
+class StartupTimer:
+    """Time-to-first-frame broken down into named steps, for --startup-timing"""
+    def __init__(self, start=IMPORT_START):
+        self.start = start
+        self.last = start
+        self.steps = []
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        print(f"{'startup step':<24} {'ms':>8}")
+        for step, ms in self.steps:
+            print(f"{step:<24} {ms:>8.1f}")
+        print(f"{'time to first frame':<24} {(self.last - self.start) * 1000:>8.1f}")
+
+# ---------------------------
+# Leaderboard
+# ---------------------------
+class Leaderboard:
+    """
+    Best scores per (difficulty, color name). Every finished run is appended to a
+    file as a 10 byte record (difficulty and color indices, score, unix time), which
+    is read back with one NumPy call at startup, and only the top_k of each group are
+    kept in memory. Appends happen on a background thread so finishing a run never
+    waits on the disk; the same thread rewrites the file down to the top scores once
+    it holds more than compact_at records.
+    """
+    MAGIC = b'ERLB'
+    VERSION = 1
+    HEADER = struct.Struct('<4sB')  # magic, version
+    RECORD = np.dtype([('difficulty', 'u1'), ('color', 'u1'), ('score', '<u4'), ('time', '<u4')])
+
+    def __init__(self, path=LEADERBOARD_PATH, top_k=LEADERBOARD_TOP_K, compact_at=LEADERBOARD_COMPACT_AT):
+        self.path = path
+        self.top_k = top_k
+        self.compact_at = compact_at
+        self.tables = {}  # (difficulty, color) -> [(score, time)], best first
+        self.file_records = 0  # Records in the file, only touched by the writer once it runs
+        self.queue = queue.Queue()
+        self.writer = None
+        self.load()
+
+    @classmethod
+    def read_records(cls, path):
+        """Every complete record in the file, as a NumPy structured array"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size:
+            # An interrupted first write leaves part of the header
+            if not cls.HEADER.pack(cls.MAGIC, cls.VERSION).startswith(data):
+                raise ValueError("not a leaderboard file (or an unsupported version)")
+            return np.zeros(0, dtype=cls.RECORD)
+        magic, version = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a leaderboard file (or an unsupported version)")
+        count = (len(data) - cls.HEADER.size) // cls.RECORD.itemsize
+        return np.frombuffer(data, dtype=cls.RECORD, count=count, offset=cls.HEADER.size)
+
+    def top_records(self, records):
+        """The top_k records of each (difficulty, color), best first and oldest first on ties"""
+        group = records['difficulty'].astype(np.int64) * 256 + records['color']
+        order = np.lexsort((records['time'], -records['score'].astype(np.int64), group))
+        group = group[order]
+        rank = np.arange(len(order)) - np.searchsorted(group, group, side='left')
+        return records[order[rank < self.top_k]]
+
+    def load(self):
+        try:
+            records = self.read_records(self.path)
+        except OSError:
+            return  # First run, nothing recorded yet
+        except ValueError:
+            bad_path = self.path + '.bad'
+            os.replace(self.path, bad_path)
+            print(f"{self.path}: not a leaderboard file, moved to {bad_path}")
+            return
+        # A run interrupted mid-write leaves part of a header or record, drop it before
+        # appending so later records stay aligned (a partial header is rewritten in full)
+        size = os.path.getsize(self.path)
+        valid_size = self.HEADER.size + len(records) * self.RECORD.itemsize if size >= self.HEADER.size else 0
+        if size != valid_size:
+            os.truncate(self.path, valid_size)
+        self.file_records = len(records)
+        difficulties, colors = list(DIFFICULTIES), list(PLAYER_COLORS)
+        for difficulty, color, score, when in self.top_records(records).tolist():
+            if difficulty < len(difficulties) and color < len(colors):
+                key = (difficulties[difficulty], colors[color])
+                self.tables.setdefault(key, []).append((score, when))
+
+    def top(self, difficulty, color):
+        """[(score, unix time)] of the best runs, best first"""
+        return self.tables.get((difficulty, color), [])
+
+    def best(self, difficulty, color):
+        table = self.tables.get((difficulty, color))
+        return table[0][0] if table else 0
+
+    def submit(self, difficulty, color, score):
+        """Add a finished run; returns its rank (0 = new best) or None if outside the top_k"""
+        score = min(int(score), 2 ** 32 - 1)
+        when = int(time.time())
+        table = self.tables.setdefault((difficulty, color), [])
+        # Equal scores rank behind the older run
+        rank = next((i for i, (other, _) in enumerate(table) if other < score), len(table))
+        table.insert(rank, (score, when))
+        del table[self.top_k:]
+
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name='leaderboard-writer', daemon=True)
+            self.writer.start()
+        self.queue.put((list(DIFFICULTIES).index(difficulty), list(PLAYER_COLORS).index(color), score, when))
+        return rank if rank < self.top_k else None
+
+    def close(self):
+        """Finish the queued writes"""
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            records = [record for record in batch if record is not None]
+            try:
+                if records:
+                    self._append(np.array(records, dtype=self.RECORD))
+                if self.file_records > self.compact_at:
+                    self.compact()
+            except OSError:
+                pass  # Read-only home: the scores still count for this session
+            if None in batch:
+                return
+
+    def _append(self, records):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            f.write(records.tobytes())
+        self.file_records += len(records)
+
+    def compact(self):
+        """Rewrite the file with only the top_k records of each group"""
+        records = self.top_records(self.read_records(self.path))
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+            f.write(records.tobytes())
+        os.replace(temp_path, self.path)
+        self.file_records = len(records)
+
+def print_leaderboard(path=LEADERBOARD_PATH):
+    """Print the top scores of every difficulty and color that has any"""
+    leaderboard = Leaderboard(path)
+    if not leaderboard.tables:
+        print("No runs recorded yet")
+    for difficulty in DIFFICULTIES:
+        for color in PLAYER_COLORS:
+            table = leaderboard.top(difficulty, color)
+            if table:
+                scores = ' '.join(str(score // 1000) for score, _ in table)
+                print(f"{difficulty:<7} {color:<7} {scores}")
+
 # ---------------------------
 # Main Game Loop
 # ---------------------------
@@ -285,12 +1687,11 @@ def draw_menu(surface, font, selected_option, current_color, high_score, difficu
     surface.fill((30, 30, 30))  # Dark gray background
     
     # Title with gradient effect
-    title_text = font.render("Pseudo 3D Endless Runner", True, (200, 200, 200))  # Updated title
-    title_rect = title_text.get_rect(center=(SCREEN_WIDTH/2, 150))
-    surface.blit(title_text, title_rect)
+    text_cache.draw_text(surface, font, "Pseudo 3D Endless Runner", (200, 200, 200), center=viewport.point(SCREEN_WIDTH/2, 150))
     
     # Draw a subtle line under the title
-    pygame.draw.line(surface, (100, 100, 100), (SCREEN_WIDTH/2 - 200, 180), (SCREEN_WIDTH/2 + 200, 180), 2)
+    pygame.draw.line(surface, (100, 100, 100), viewport.point(SCREEN_WIDTH/2 - 200, 180),
+                     viewport.point(SCREEN_WIDTH/2 + 200, 180), viewport.length(2))
     
     # Options with hover effect
     options = [
@@ -302,56 +1703,134 @@ def draw_menu(surface, font, selected_option, current_color, high_score, difficu
     option_rects = []
     for i, (text, pos) in enumerate(options):
         # Background rectangle for each option
-        bg_rect = pygame.Rect(SCREEN_WIDTH/2 - 150, pos[1] - 20, 300, 40)
-        pygame.draw.rect(surface, (50, 50, 50) if selected_option != i else (80, 80, 80), bg_rect, border_radius=10)
+        bg_rect = viewport.rect(SCREEN_WIDTH/2 - 150, pos[1] - 20, 300, 40)
+        pygame.draw.rect(surface, (50, 50, 50) if selected_option != i else (80, 80, 80), bg_rect,
+                         border_radius=viewport.length(10))
         
         # Text with highlight effect
         color = (200, 200, 200) if selected_option != i else (255, 255, 255)
-        text_surface = font.render(text, True, color)
-        text_rect = text_surface.get_rect(center=pos)
-        surface.blit(text_surface, text_rect)
+        text_cache.draw_text(surface, font, text, color, center=viewport.point(*pos))
         option_rects.append(bg_rect)  # Use the background rect for click detection
     
     # High Score with modern look
     if high_score > 0:
-        high_score_text = font.render(f"High Score: {high_score // 1000}", True, (150, 150, 255))  # Light blue
-        high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH/2, 400))
-        surface.blit(high_score_text, high_score_rect)
+        text_cache.draw_number(surface, font, "High Score: ", int(high_score // 1000), (150, 150, 255), center=viewport.point(SCREEN_WIDTH/2, 400))  # Light blue
 
     
     return option_rects
 
-def main():
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Pseudo‑3D Endless Runner")
+def draw_game(surface, font, snapshot, high_score, background, shadow=True):
+    """Draw one gameplay frame from a snapshot of the simulation"""
+    # Draw background with road animation
+    background.draw(surface, snapshot.road_offset)
+    profiler.mark('background')
+
+    # Draw obstacles and player
+    draw_entities(surface, snapshot, shadow=shadow)
+    profiler.mark('entities')
+
+    draw_hud(surface, font, snapshot, high_score)
+
+def draw_hud(surface, font, snapshot, high_score):
+    """Difficulty in the top left, score and best in the top right"""
+    text_cache.draw_text(surface, font, f"Difficulty: {snapshot.difficulty}", (200, 200, 200), topleft=viewport.point(10, 10))
+    text_cache.draw_number(surface, font, "Score: ", int(snapshot.score // 1000), BLACK, topleft=viewport.point(SCREEN_WIDTH - 200, 10))
+    text_cache.draw_number(surface, font, "Best: ", int(high_score // 1000), BLACK, topleft=viewport.point(SCREEN_WIDTH - 200, 40))
+
+def draw_game_over(surface, font, score, high_score, background):
+    """Draw the game over screen over a static road"""
+    # Draw background without animation
+    background.draw(surface)
+
+    # Draw game over text
+    text_cache.draw_text(surface, font, "Game Over! Press ENTER for Menu", RED, midtop=viewport.point(SCREEN_WIDTH/2, SCREEN_HEIGHT/2))
+    text_cache.draw_number(surface, font, "Score: ", int(score // 1000), BLACK, midtop=viewport.point(SCREEN_WIDTH/2, SCREEN_HEIGHT/2 + 40))
+    text_cache.draw_number(surface, font, "Best: ", int(high_score // 1000), BLACK, midtop=viewport.point(SCREEN_WIDTH/2, SCREEN_HEIGHT/2 + 80))
+
+def main(profile_csv=None, seed=None, record_path=None, startup_timing=False, dirty_rects=True,
+         quality='auto', quality_log=None, fullscreen=False, leaderboard_path=LEADERBOARD_PATH,
+         threaded_sim=False):
+    startup = StartupTimer()
+    startup.mark('import')
+    init_pygame()
+    startup.mark('pygame init')
+    screen = open_window("Pseudo‑3D Endless Runner", fullscreen)
     clock = pygame.time.Clock()
+    startup.mark('window')
     
     # Game state management: "menu", "playing", "game_over"
     state = "menu"
     
-    # Initialize player and obstacles (they will be reset each game)
-    player = Player()
-    obstacles = []
-    obstacle_timer = 0
-    obstacle_interval = 1000  # in milliseconds between obstacle spawns
-    score = 0
-    font = pygame.font.SysFont("Arial", 30)
+    # Gameplay state lives in the simulation (it will be reset each game)
+    sim = GameSimulation()
+    replay = Replay.for_simulation(sim)
+    startup.mark('simulation')
+    font = font_resolver.load("Arial", viewport.length(30))
+    overlay_font = font_resolver.load("Arial", 14)
+    startup.mark('fonts')
+    background = BackgroundCache()
+    leaderboard = Leaderboard(leaderboard_path)
+    startup.mark('leaderboard')
+    first_frame = True
+
+    # Gameplay is drawn through the view for the current quality level, built on first use
+    levels = [settings['name'] for settings in QUALITY_LEVELS]
+    governor = QualityGovernor(level=0 if quality == 'auto' else levels.index(quality))
+    views = {}
+    drawn_quality = None  # QualityView that drew the last gameplay frame
+    base_scale = viewport.scale  # Render scale of the levels at full resolution
 
     # Add new variables
-    high_score = 0
     selected_option = 0  # 0 for Play, 1 for Color, 2 for Difficulty
     current_color_name = 'BLUE'
     current_color = PLAYER_COLORS[current_color_name]
     current_difficulty = 'HARD'
+    high_score = 0  # Best score for the current difficulty and color
     option_rects = []  # Store clickable areas
-    road_offset = 0.0  # Add this line
+    accumulator = 0.0  # Milliseconds of real time not yet simulated
+    pressed = {'a': False, 'd': False, 'jump': False}  # Key presses since the last tick
+    simulation = None  # SimulationThread running the current game, with threaded_sim
+    runs_recorded = 0  # Replays saved so far with record_path
+    pacing = None  # FramePacing of the frames rendered from it
+
+    # Profiling runs while the F3 overlay is shown, or for the whole session when dumping CSV
+    show_profiler = False
+    profiler.enabled = profile_csv is not None
+    profiler_stats = {}
+
+    # The menu and game over screens only redraw when what they show changes
+    drawn_view = None  # (state, selected option, color, difficulty, overlay) last drawn
+    force_redraw = False
     
     running = True
     while running:
-        dt = clock.tick(FPS)
-        for event in pygame.event.get():
+        previous_state = state
+        view = (state, selected_option, current_color_name, current_difficulty, show_profiler)
+        if state != "playing" and not show_profiler and view == drawn_view and not force_redraw:
+            # Nothing to animate: sleep until there is input instead of spinning at FPS
+            event = pygame.event.wait(IDLE_WAIT_MS)
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events += pygame.event.get()
+            dt = clock.tick()
+        else:
+            dt = clock.tick(FPS)
+            events = pygame.event.get()
+            if state == "playing" and quality == 'auto':
+                # Work time of the gameplay frame just drawn, without the frame cap's sleep
+                governor.update(clock.get_rawtime())
+        profiler.begin_frame()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_profiler = not show_profiler
+                profiler.enabled = show_profiler or profile_csv is not None
+                for quality_view in views.values():
+                    quality_view.reset()
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSIZECHANGED):
+                force_redraw = True
+                for quality_view in views.values():
+                    quality_view.reset()
                 
             if state == "menu":
                 # Handle mouse events
@@ -361,11 +1840,10 @@ def main():
                         if rect.collidepoint(mouse_pos):
                             if i == 0:  # Play
                                 state = "playing"
-                                player = Player(current_color, current_difficulty)
-                                obstacles = []
-                                score = 0
-                                obstacle_timer = 0
-                                obstacle_interval = DIFFICULTIES[current_difficulty]['interval']
+                                sim = GameSimulation(current_color, current_difficulty, seed)
+                                replay = Replay.for_simulation(sim)
+                                accumulator = 0.0
+                                background.set_speed(DIFFICULTIES[current_difficulty]['speed'])
                             elif i == 1:  # Change Color
                                 color_names = list(PLAYER_COLORS.keys())
                                 current_index = color_names.index(current_color_name)
@@ -385,11 +1863,10 @@ def main():
                     elif event.key == pygame.K_RETURN:
                         if selected_option == 0:  # Play
                             state = "playing"
-                            player = Player(current_color, current_difficulty)
-                            obstacles = []
-                            score = 0
-                            obstacle_timer = 0
-                            obstacle_interval = DIFFICULTIES[current_difficulty]['interval']
+                            sim = GameSimulation(current_color, current_difficulty, seed)
+                            replay = Replay.for_simulation(sim)
+                            accumulator = 0.0
+                            background.set_speed(DIFFICULTIES[current_difficulty]['speed'])
                         elif selected_option == 1:  # Change Color
                             color_names = list(PLAYER_COLORS.keys())
                             current_index = color_names.index(current_color_name)
@@ -403,116 +1880,628 @@ def main():
             elif state == "playing":
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
-                        player.jump()
+                        pressed['jump'] = True
+                    elif event.key == pygame.K_a:
+                        pressed['a'] = True
+                    elif event.key == pygame.K_d:
+                        pressed['d'] = True
             elif state == "game_over":
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                     state = "menu"
 
-        keys = pygame.key.get_pressed()
+        profiler.mark('events')
+
+        # Update phase: run as many fixed ticks as the elapsed time covers
+        # (input, physics, spawning and collision on each tick's hitboxes)
         if state == "playing":
-            # Update player and obstacles
-            player.move(keys)
-            player.update()
-            
-            # Update road offset using current difficulty speed
-            road_offset += DIFFICULTIES[current_difficulty]['speed']
-            if road_offset >= 1.0:
-                road_offset -= 1.0
-                
-            # Update obstacles with the same speed
-            for obs in obstacles[:]:
-                obs.speed = DIFFICULTIES[current_difficulty]['speed']  # Sync obstacle speed
-                obs.update()
-                if obs.is_off_screen():
-                    obstacles.remove(obs)
-            
-            # Spawn obstacles with random grouping
-            obstacle_timer += dt
-            if obstacle_timer > obstacle_interval:
-                obstacle_timer = 0
-                
-                # Adjust weights based on difficulty
-                if current_difficulty == 'EASY':
-                    weights = [0.8, 0.2, 0.0]  # Mostly single obstacles
-                elif current_difficulty == 'MEDIUM':
-                    weights = [0.6, 0.3, 0.1]  # Some doubles, rare triples
-                else:  # HARD
-                    weights = [0.4, 0.4, 0.2]  # More doubles and triples
-                    
-                num_obstacles = random.choices([1, 2, 3], weights=weights)[0]
-                for _ in range(num_obstacles):
-                    obstacles.append(Obstacle(current_difficulty))
-                
-                # Randomize interval slightly for more variety
-                obstacle_interval = DIFFICULTIES[current_difficulty]['interval'] * random.uniform(0.8, 1.2)
-                
-            # Draw everything
-            draw_background(screen, road_offset)
-            
-            # Draw difficulty in the top left
-            difficulty_text = font.render(f"Difficulty: {current_difficulty}", True, (200, 200, 200))
-            screen.blit(difficulty_text, (10, 10))  # Positioned in the top left
-            
-            # Draw obstacles and player
-            for obs in obstacles:
-                obs_rect, obs_height = obs.draw(screen)
-                if check_collision(player_rect, player_height, obs_rect, obs_height):
-                    state = "game_over"
-                    break
-            player_rect, player_height = player.draw(screen)
-            
-            # Draw score
-            score_text = font.render(f"Score: {score // 1000}", True, BLACK)
-            high_score_text = font.render(f"Best: {high_score // 1000}", True, BLACK)
-            screen.blit(score_text, (SCREEN_WIDTH - 200, 10))
-            screen.blit(high_score_text, (SCREEN_WIDTH - 200, 40))
-            
-            # Draw score
-            score += dt
+            if previous_state != "playing":
+                dt = 0  # Don't count time spent waiting on the menu
+                governor.restart()
+                if threaded_sim:
+                    simulation = SimulationThread(sim, replay)
+                    simulation.start()
+                    pacing = FramePacing()
+            if simulation is not None:
+                # The simulation thread ticks on its own, hand it this frame's input
+                no_presses = {'a': False, 'd': False, 'jump': False}
+                simulation.set_input(read_inputs(pygame.key.get_pressed(), no_presses), pressed)
+                pressed = no_presses
+                if simulation.latest()[0].state == "game_over":
+                    simulation.stop()
+                    state = sim.state
+                    print(pacing.report(simulation))
+            else:
+                accumulator += dt
+                steps = 0
+                while accumulator >= TICK_MS and steps < MAX_CATCH_UP_STEPS and state == "playing":
+                    inputs = read_inputs(pygame.key.get_pressed(), pressed)
+                    replay.record(inputs)
+                    state = sim.step(inputs, TICK_MS)
+                    pressed = {'a': False, 'd': False, 'jump': False}
+                    accumulator -= TICK_MS
+                    steps += 1
+                if steps == MAX_CATCH_UP_STEPS:
+                    # Too far behind: drop the backlog instead of spiralling
+                    accumulator = min(accumulator, TICK_MS)
+            if state == "game_over":
+                # Queue the run for the leaderboard file, the writer thread does the disk I/O
+                leaderboard.submit(current_difficulty, current_color_name, sim.score)
+                replay.finish(sim)
+                if record_path is not None:
+                    # Number the files so every run of the session is kept
+                    runs_recorded += 1
+                    root, ext = os.path.splitext(record_path)
+                    replay.save(f"{root}-{runs_recorded}{ext}")
+                simulation = None
 
-        # Update high score when game ends
-        if state == "game_over":
-            high_score = max(high_score, score)
+        # Render phase: draw the current state exactly once, and menus only when they changed
+        view = (state, selected_option, current_color_name, current_difficulty, show_profiler)
+        if state != "playing" and not show_profiler and view == drawn_view and not force_redraw:
+            profiler.end_frame()
+            continue
+        # Only the option rows change while the menu stays up, unless the high score shown does.
+        # The F3 overlay changes every frame, so the whole screen is pushed while it is (or was) up
+        drawn_high_score = high_score
+        high_score = leaderboard.best(current_difficulty, current_color_name)
+        partial = (state == "menu" and drawn_view is not None and drawn_view[0] == "menu"
+                   and not drawn_view[4] and not show_profiler and not force_redraw
+                   and high_score == drawn_high_score)
+        drawn_view = view
+        force_redraw = False
+        update_rects = None  # Rects to push instead of flipping the whole screen
 
-        # Clear the screen before drawing
-        screen.fill(SKY_BLUE)
-        
         if state == "menu":
             option_rects = draw_menu(screen, font, selected_option, current_color_name, high_score, current_difficulty)
         elif state == "playing":
-            # Draw background with road animation
-            draw_background(screen, road_offset)
-            # Draw obstacles and player
-            for obs in obstacles:
-                obs_rect, obs_height = obs.draw(screen)
-                if check_collision(player_rect, player_height, obs_rect, obs_height):
-                    state = "game_over"
-                    break
-            player_rect, player_height = player.draw(screen)
-            # Draw score
-            score_text = font.render(f"Score: {score // 1000}", True, BLACK)
-            high_score_text = font.render(f"Best: {high_score // 1000}", True, BLACK)
-            screen.blit(score_text, (SCREEN_WIDTH - 200, 10))
-            screen.blit(high_score_text, (SCREEN_WIDTH - 200, 40))
+            if simulation is not None:
+                # Interpolate the latest published tick by the time since it ran
+                tick_snapshot, tick, tick_time = simulation.latest()
+                pacing.frame(tick)
+                snapshot = tick_snapshot.at(min(max((time.perf_counter() - tick_time) * 1000 / TICK_MS, 0.0), 1.0))
+            else:
+                # Interpolate between the last two ticks by the time left in the accumulator
+                snapshot = sim.snapshot(min(accumulator / TICK_MS, 1.0))
+            if viewport.scale != base_scale * governor.settings['resolution']:
+                # The level renders at another internal resolution: reopen the window at it
+                # and rebuild everything sized for the old one
+                set_render_scale(base_scale * governor.settings['resolution'])
+                screen = open_window("Pseudo‑3D Endless Runner", fullscreen)
+                font = font_resolver.load("Arial", viewport.length(30))
+                background = BackgroundCache()
+                views = {}
+                drawn_quality = None
+            quality_view = views.get(governor.level)
+            if quality_view is None:
+                quality_view = views[governor.level] = QualityView(
+                    governor.settings, dirty_rects, background if governor.level == 0 else None)
+            if quality_view is not drawn_quality or previous_state != "playing":
+                # Level changed or a new game started: repaint the whole screen.
+                # Each level's cache has the whole budget, so only the level in use keeps its frames
+                if drawn_quality is not None and drawn_quality is not quality_view:
+                    drawn_quality.background.evict()
+                quality_view.background.set_speed(snapshot.speed)
+                quality_view.reset()
+                drawn_quality = quality_view
+            update_rects = quality_view.draw(screen, font, snapshot, high_score)
         elif state == "game_over":
-            # Draw background without animation
-            draw_background(screen)
-            # Draw game over text
-            game_over_text = font.render("Game Over! Press ENTER for Menu", True, RED)
-            score_text = font.render(f"Score: {score // 1000}", True, BLACK)
-            high_score_text = font.render(f"Best: {high_score // 1000}", True, BLACK)
-            screen.blit(game_over_text, (SCREEN_WIDTH/2 - game_over_text.get_width()/2, SCREEN_HEIGHT/2))
-            screen.blit(score_text, (SCREEN_WIDTH/2 - score_text.get_width()/2, SCREEN_HEIGHT/2 + 40))
-            screen.blit(high_score_text, (SCREEN_WIDTH/2 - high_score_text.get_width()/2, SCREEN_HEIGHT/2 + 80))
+            draw_game_over(screen, font, sim.score, high_score, background)
+        profiler.mark('text')
+
+        if show_profiler:
+            # Recompute the percentiles a few times a second rather than every frame
+            if profiler.frames % 15 == 0 or not profiler_stats:
+                profiler_stats = profiler.percentiles()
+            renderer = drawn_quality.renderer if state == "playing" else None
+            extra_rows = {'kpixels': renderer.percentiles()} if renderer is not None else None
+            text_stats = text_cache.stats()
+            status = [f"quality: {governor.settings['name']} ({quality})",
+                      f"text cache: {text_stats['hit_rate']:.1%} hits, {text_stats['entries']} entries"]
+            if simulation is not None:
+                status.append(pacing.report(simulation))
+            panel = draw_profiler_overlay(screen, overlay_font, profiler_stats, extra_rows, status)
+            if update_rects is not None:
+                update_rects.append(panel)
+            profiler.mark('overlay')
             
-        pygame.display.flip()
+        if partial:
+            pygame.display.update(option_rects)
+        elif update_rects is not None:
+            pygame.display.update(update_rects)
+        else:
+            pygame.display.flip()
+        profiler.mark('flip')
+        profiler.end_frame()
+        if first_frame:
+            first_frame = False
+            startup.mark('first frame')
+            if startup_timing:
+                startup.report()
     
+    if profile_csv is not None:
+        profiler.dump_csv(profile_csv)
+    if quality_log is not None:
+        with open(quality_log, 'w') as f:
+            json.dump(governor.history, f, indent=2)
+    if simulation is not None:
+        simulation.stop()
+    leaderboard.close()
     pygame.quit()
     sys.exit()
 
+# ---------------------------
+# Replays
+# ---------------------------
+class Replay:
+    """
+    Seed, difficulty, color and per-tick input of one run. Saved as a small header
+    followed by one zlib-compressed byte per tick (bit 0 = A, bit 1 = D, bit 2 = SPACE).
+    Re-simulating the inputs with the same seed reproduces the run exactly.
+    """
+    MAGIC = b'ERRP'
+    VERSION = 2  # Version 2: obstacles come from PatternGenerator
+    HEADER = struct.Struct('<4sBBI3BId')  # magic, version, difficulty, seed, color, ticks, final score
+
+    def __init__(self, seed, difficulty='MEDIUM', color=BLUE, inputs=b'', ticks=None, final_score=0.0):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.color = tuple(color)
+        self.inputs = bytearray(inputs)
+        self.final_score = final_score
+        self.recorded_ticks = len(self.inputs) if ticks is None else ticks
+
+    @classmethod
+    def for_simulation(cls, sim):
+        return cls(sim.seed, sim.difficulty, sim.player.color)
+
+    def record(self, inputs):
+        self.inputs.append(inputs['a'] | inputs['d'] << 1 | inputs['jump'] << 2)
+
+    def finish(self, sim):
+        """Remember how the run ended so playback can be checked against it"""
+        self.final_score = sim.score
+        self.recorded_ticks = len(self.inputs)
+
+    def tick_inputs(self):
+        """Yield the input dict for every recorded tick"""
+        for bits in self.inputs:
+            yield {'a': bool(bits & 1), 'd': bool(bits & 2), 'jump': bool(bits & 4)}
+
+    def to_bytes(self):
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, list(DIFFICULTIES).index(self.difficulty),
+                                  self.seed, *self.color, self.recorded_ticks, self.final_score)
+        return header + zlib.compress(bytes(self.inputs), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, difficulty, seed, r, g, b, ticks, final_score = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a replay file (or an unsupported version)")
+        inputs = zlib.decompress(data[cls.HEADER.size:])
+        return cls(seed, list(DIFFICULTIES)[difficulty], (r, g, b), inputs, ticks, final_score)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def simulate_replay(replay):
+    """Re-simulate a replay headless as fast as possible and return the finished simulation"""
+    sim = GameSimulation(replay.color, replay.difficulty, replay.seed)
+    for inputs in replay.tick_inputs():
+        if sim.step(inputs) != "playing":
+            break
+    return sim
+
+def check_replays(paths):
+    """Re-simulate every replay headless and report whether each reproduces its recorded score"""
+    start = time.perf_counter()
+    total_ticks = 0
+    mismatches = 0
+    for path in paths:
+        replay = Replay.load(path)
+        sim = simulate_replay(replay)
+        ticks = round(sim.score / TICK_MS)
+        total_ticks += ticks
+        ok = ticks == replay.recorded_ticks and sim.score == replay.final_score
+        mismatches += not ok
+        print(f"{path}: {replay.difficulty} seed={replay.seed} score={int(sim.score // 1000)} "
+              f"ticks={ticks} {'ok' if ok else 'MISMATCH (recorded score ' + str(int(replay.final_score // 1000)) + ')'}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} replays, {total_ticks} ticks in {elapsed:.2f}s "
+          f"({total_ticks / max(elapsed, 1e-9):.0f} ticks/s), {mismatches} mismatches")
+    return mismatches
+
+def play_replay(replay, speed=1):
+    """Render a replay in a window at speed times real time (ESC or closing the window stops it)"""
+    init_pygame()
+    screen = open_window(f"Pseudo‑3D Endless Runner - replay {speed}x")
+    clock = pygame.time.Clock()
+    font = font_resolver.load("Arial", viewport.length(30))
+    background = BackgroundCache()
+    background.set_speed(DIFFICULTIES[replay.difficulty]['speed'])
+    sim = GameSimulation(replay.color, replay.difficulty, replay.seed)
+    inputs = replay.tick_inputs()
+
+    running = True
+    while running:
+        clock.tick(TICK_RATE)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+        for _ in range(speed):
+            tick_inputs = next(inputs, None)
+            if sim.state != "playing" or tick_inputs is None:
+                break
+            sim.step(tick_inputs)
+
+        if sim.state == "playing":
+            draw_game(screen, font, sim.snapshot(), replay.final_score, background)
+            text_cache.draw_text(screen, font, f"REPLAY {speed}x", RED, midtop=viewport.point(SCREEN_WIDTH/2, 10))
+        else:
+            draw_game_over(screen, font, sim.score, replay.final_score, background)
+        pygame.display.flip()
+
+# ---------------------------
+# Bot Environment
+# ---------------------------
+ACTION_NOOP, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP = range(4)
+EPISODE_MAX_TICKS = TICK_RATE * 60 * 5  # Cap episodes at five minutes of play
+NO_OBSTACLE_DISTANCE = 2.0  # Observed distance for a lane with nothing ahead
+
+class RunnerEnv:
+    """
+    Gym-style environment around GameSimulation for bots. reset(seed) returns an
+    observation; step(action) returns (observation, reward, done, info), with a
+    reward of 1 per tick survived. Each LEFT/RIGHT action is a fresh key press.
+
+    Observation (float32): player lane, player x / lane spacing, player height,
+    jumping flag, then for every lane the distance (1 - world_y) to the nearest
+    obstacle ahead and whether it is a raised obstacle.
+    """
+    def __init__(self, difficulty='MEDIUM', max_ticks=EPISODE_MAX_TICKS):
+        self.difficulty = difficulty
+        self.max_ticks = max_ticks
+        self.observation_size = 4 + 2 * len(LANES)
+        self.sim = None
+        self.ticks = 0
+
+    def reset(self, seed=None):
+        self.sim = GameSimulation(BLUE, self.difficulty, seed)
+        self.ticks = 0
+        return self.observation()
+
+    def step(self, action):
+        sim = self.sim
+        sim.player.last_key_state = {'a': False, 'd': False}  # Every action is a new press
+        sim.step({'a': action == ACTION_LEFT, 'd': action == ACTION_RIGHT, 'jump': action == ACTION_JUMP})
+        self.ticks += 1
+        done = sim.state != "playing" or self.ticks >= self.max_ticks
+        info = {'score': sim.score, 'ticks': self.ticks, 'crashed': sim.state != "playing"}
+        return self.observation(), 1.0, done, info
+
+    def observation(self, out=None):
+        if out is None:
+            out = np.empty(self.observation_size, dtype=np.float32)
+        player = self.sim.player
+        out[0] = player.current_lane
+        out[1] = player.world_x / (LANES[1] - LANES[0])
+        out[2] = player.height
+        out[3] = player.is_jumping
+        index = self.sim.obstacles.index
+        # Obstacles past the player (world_y > 1) stay in their bucket until culled
+        ahead_limit = 1.0 - index.travelled
+        for lane, bucket in enumerate(index.buckets):
+            out[4 + 2 * lane] = NO_OBSTACLE_DISTANCE
+            out[5 + 2 * lane] = 0.0
+            # Buckets are ordered oldest first, so the first one not yet past is the nearest ahead
+            for road_y, height in bucket:
+                if road_y <= ahead_limit:
+                    out[4 + 2 * lane] = 1.0 - (road_y + index.travelled)
+                    out[5 + 2 * lane] = height > 0
+                    break
+        return out
+
+class BatchedRunnerEnv:
+    """
+    N RunnerEnvs stepped in lockstep. Observations, rewards and done flags are
+    (N, ...) arrays, and finished environments reset themselves with the next seed,
+    so a batched policy can run without per-environment bookkeeping.
+    """
+    def __init__(self, num_envs, difficulty='MEDIUM', max_ticks=EPISODE_MAX_TICKS):
+        self.envs = [RunnerEnv(difficulty, max_ticks) for _ in range(num_envs)]
+        size = self.envs[0].observation_size
+        self.observations = np.zeros((num_envs, size), dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.next_seed = 0
+
+    def reset(self, seed=0):
+        self.next_seed = seed
+        for i, env in enumerate(self.envs):
+            env.reset(self.next_seed)
+            env.observation(self.observations[i])
+            self.next_seed += 1
+        return self.observations
+
+    def step(self, actions):
+        """Step every environment with its action; returns (observations, rewards, dones, infos)"""
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            _, self.rewards[i], self.dones[i], info = env.step(int(action))
+            infos.append(info)
+            if self.dones[i]:
+                env.reset(self.next_seed)
+                self.next_seed += 1
+            env.observation(self.observations[i])
+        return self.observations, self.rewards, self.dones, infos
+
+def random_policy(observation, rng=random):
+    return rng.choice((ACTION_NOOP, ACTION_NOOP, ACTION_NOOP, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP))
+
+def dodge_policy(observation, rng=None):
+    """Baseline bot: jump or step aside when an obstacle is about to reach the player's lane"""
+    lane = int(observation[0])
+    distance = observation[4 + 2 * lane]
+    if 0.05 < distance < 0.15 and not observation[3]:
+        for side, action in ((lane - 1, ACTION_LEFT), (lane + 1, ACTION_RIGHT)):
+            if 0 <= side < len(LANES) and observation[4 + 2 * side] > 0.3:
+                return action
+        return ACTION_JUMP
+    return ACTION_NOOP
+
+POLICIES = {'random': random_policy, 'dodge': dodge_policy}
+
+def run_episode(policy_name, seed, difficulty='MEDIUM', max_ticks=EPISODE_MAX_TICKS):
+    """Play one headless episode and return (seed, score in ms, ticks)"""
+    policy = POLICIES[policy_name]
+    rng = random.Random(seed)
+    env = RunnerEnv(difficulty, max_ticks)
+    observation = env.reset(seed)
+    done = False
+    while not done:
+        observation, _, done, info = env.step(policy(observation, rng))
+    return seed, info['score'], info['ticks']
+
+def evaluate_policy(policy_name, episodes, difficulty='MEDIUM', workers=None, max_ticks=EPISODE_MAX_TICKS):
+    """Spread episodes over a process pool (all cores by default) and report episodes/sec"""
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_episode, [policy_name] * episodes, range(episodes),
+                                [difficulty] * episodes, [max_ticks] * episodes,
+                                chunksize=max(1, episodes // (workers * 4))))
+    elapsed = time.perf_counter() - start
+    scores = sorted(score // 1000 for _, score, _ in results)
+    ticks = sum(t for _, _, t in results)
+    print(f"{policy_name} on {difficulty}: {episodes} episodes on {workers} workers in {elapsed:.2f}s "
+          f"({episodes / elapsed:.1f} episodes/s, {ticks / elapsed:.0f} ticks/s)")
+    print(f"score mean {sum(scores) / len(scores):.1f}, median {scores[len(scores) // 2]:.0f}, best {scores[-1]:.0f}")
+    return results
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+BENCH_OBSTACLE_COUNTS = [10, 100, 1000, 10000]
+
+def time_call(fn, iterations):
+    """Call fn iterations times and return per-call timings in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def summarize_timings(group, name, timings):
+    ordered = sorted(timings)
+    return {
+        'group': group,
+        'name': name,
+        'iterations': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered),
+        'p50_ms': ordered[len(ordered) // 2],
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max_ms': ordered[-1]
+    }
+
+def scripted_inputs(tick):
+    """Deterministic input pattern for benchmark runs: jump and change lanes periodically"""
+    return {'a': tick % 90 == 30, 'd': tick % 90 == 60, 'jump': tick % 45 == 0}
+
+def fill_obstacles(field, count):
+    """Spread count obstacles evenly down the road, away from the centre lane"""
+    for i in range(count):
+        world_y = 1.1 - 1.3 * (i + 1) / count
+        lane = 0 if i % 2 == 0 else len(LANES) - 1
+        field.add(LANES[lane], world_y, 0, lane)
+
+def run_benchmarks(output_path="bench_results.json", iterations=300):
+    """
+    Time the rendering and simulation hot paths under the SDL dummy video driver,
+    print a table and write the results to JSON for comparing builds.
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    init_pygame()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    font = font_resolver.load("Arial", 30)
+    random.seed(0)
+    results = []
+
+    def record(group, name, fn, count=iterations):
+        fn()  # Warm caches so the numbers show steady state
+        results.append(summarize_timings(group, name, time_call(fn, count)))
+
+    # Individual drawing and projection functions
+    offsets = iter([i * ROAD_SPEED for i in range(10 * iterations)])
+    record('render', 'draw_background', lambda: draw_background(screen, next(offsets)))
+    background = BackgroundCache()
+    background.set_speed(ROAD_SPEED)
+    background.prerender()  # Every phase, not just the one the warm-up call draws
+    record('render', 'BackgroundCache.draw', lambda: background.draw(screen, next(offsets)))
+    points = [(LANES[i % len(LANES)], i / 1000) for i in range(1000)]
+    record('render', 'project x1000', lambda: [project(x, y) for x, y in points])
+    obstacle = Obstacle()
+    obstacle.world_y = 0.5
+    record('render', 'Obstacle.draw', lambda: obstacle.draw(screen))
+    player = Player()
+    record('render', 'Player.draw', lambda: player.draw(screen))
+    player.height = 40
+    record('render', 'Player.draw (jumping)', lambda: player.draw(screen))
+    record('render', 'draw_menu', lambda: draw_menu(screen, font, 0, 'BLUE', 123000, 'MEDIUM'))
+
+    # Full scripted gameplay frame (tick + render + flip) at each difficulty
+    for difficulty in DIFFICULTIES:
+        background.set_speed(DIFFICULTIES[difficulty]['speed'])
+        background.prerender()
+        state = {'sim': GameSimulation(BLUE, difficulty, seed=0), 'tick': 0}
+
+        def gameplay_frame():
+            if state['sim'].state != "playing":
+                state['sim'] = GameSimulation(BLUE, difficulty, seed=state['tick'])
+            state['sim'].step(scripted_inputs(state['tick']))
+            state['tick'] += 1
+            draw_game(screen, font, state['sim'].snapshot(), 0, background)
+            pygame.display.flip()
+
+        record('frame', f'gameplay {difficulty}', gameplay_frame)
+
+    # Same scripted frame drawn by the dirty rect renderer, with the pixels it pushes
+    background.set_speed(ROAD_SPEED)
+    background.prerender()
+    renderer = DirtyRectRenderer(background)
+    state = {'sim': GameSimulation(BLUE, 'MEDIUM', seed=0), 'tick': 0}
+
+    def dirty_frame():
+        if state['sim'].state != "playing":
+            state['sim'] = GameSimulation(BLUE, 'MEDIUM', seed=state['tick'])
+            renderer.reset()
+        state['sim'].step(scripted_inputs(state['tick']))
+        state['tick'] += 1
+        pygame.display.update(renderer.draw(screen, font, state['sim'].snapshot(), 0))
+
+    record('frame', 'gameplay MEDIUM dirty', dirty_frame)
+    results[-1]['kpixels_p50'] = renderer.percentiles()[0]
+
+    # The same scripted frame at each quality level the governor can pick, at its internal resolution
+    for settings in QUALITY_LEVELS:
+        set_render_scale(settings['resolution'])
+        screen = pygame.display.set_mode(viewport.size)
+        level_font = font_resolver.load("Arial", viewport.length(30))
+        quality_view = QualityView(settings)
+        quality_view.background.set_speed(ROAD_SPEED)
+        quality_view.background.prerender()
+        state = {'sim': GameSimulation(BLUE, 'MEDIUM', seed=0), 'tick': 0}
+
+        def quality_frame():
+            if state['sim'].state != "playing":
+                state['sim'] = GameSimulation(BLUE, 'MEDIUM', seed=state['tick'])
+                quality_view.reset()
+            state['sim'].step(scripted_inputs(state['tick']))
+            state['tick'] += 1
+            pygame.display.update(quality_view.draw(screen, level_font, state['sim'].snapshot(), 0))
+
+        record('frame', f"quality {settings['name']}", quality_frame)
+        results[-1]['kpixels_p50'] = quality_view.renderer.percentiles()[0]
+    set_render_scale(1.0)
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    # Stress: tick + render with a constant number of live obstacles
+    for count in BENCH_OBSTACLE_COUNTS:
+        sim = GameSimulation(BLUE, 'MEDIUM', seed=0)
+        fill_obstacles(sim.obstacles, count)
+
+        def stress_frame():
+            sim.step({'a': False, 'd': False, 'jump': False})
+            culled = count - len(sim.obstacles)
+            for _ in range(max(0, culled)):
+                sim.obstacles.add(LANES[0], -0.2, 0, 0)  # Keep the count steady
+            draw_game(screen, font, sim.snapshot(), 0, background)
+            pygame.display.flip()
+
+        record('stress', f'{count} obstacles', stress_frame, max(10, min(iterations, 30000 // count)))
+
+    print(f"{'group':<8} {'benchmark':<26} {'iters':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for r in results:
+        print(f"{r['group']:<8} {r['name']:<26} {r['iterations']:>6} {r['mean_ms']:>9.3f} "
+              f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['max_ms']:>9.3f}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'video_driver': pygame.display.get_driver(),
+            'iterations': iterations
+        },
+        'results': results,
+        'text_cache': text_cache.stats()
+    }
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+    return report
+
 # ---------------------------
 # Entry Point
 # ---------------------------
-if __name__ == "__main__":
-    main()
+def seed_arg(value):
+    """argparse type for --seed: replays store the seed as an unsigned 32-bit integer"""
+    seed = int(value)
+    if not 0 <= seed < 2 ** 32:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {2 ** 32 - 1}")
+    return seed
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pseudo-3D Endless Runner")
+    parser.add_argument('--bench', action='store_true', help="run the benchmark suite headless and exit")
+    parser.add_argument('--bench-output', default="bench_results.json", help="where --bench writes its JSON results")
+    parser.add_argument('--bench-iterations', type=int, default=300, help="iterations per benchmark")
+    parser.add_argument('--seed', type=seed_arg, help="seed every run so it can be reproduced (0 to 2**32 - 1)")
+    parser.add_argument('--record', metavar='PATH',
+                        help="save a replay of each finished run, numbered: PATH run.replay writes run-1.replay, ...")
+    parser.add_argument('--replay', metavar='PATH', nargs='+', help="play back replay files")
+    parser.add_argument('--replay-speed', type=int, default=1,
+                        help="playback speed (1, 4, 16, ...); 0 re-simulates headless at full speed and checks scores")
+    parser.add_argument('--evaluate', type=int, metavar='EPISODES', help="run bot episodes headless across all cores")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='dodge', help="bot policy for --evaluate")
+    parser.add_argument('--difficulty', choices=list(DIFFICULTIES), default='MEDIUM', help="difficulty for --evaluate")
+    parser.add_argument('--workers', type=int, help="worker processes for --evaluate (default: all cores)")
+    parser.add_argument('--leaderboard', action='store_true', help="print the best scores for each difficulty and color")
+    parser.add_argument('--startup-timing', action='store_true', help="print a time-to-first-frame breakdown")
+    parser.add_argument('--quality', choices=['auto'] + [settings['name'] for settings in QUALITY_LEVELS],
+                        default='auto', help="rendering quality, 'auto' adapts it to the frame times")
+    parser.add_argument('--quality-log', help="write the quality governor's level changes to this JSON file on exit")
+    parser.add_argument('--render-scale', type=float, default=RENDER_SCALE,
+                        help="internal render resolution relative to 800x600, independent of the window size")
+    parser.add_argument('--fullscreen', action='store_true', help="scale the game up to fill the screen")
+    parser.add_argument('--full-redraw', action='store_true',
+                        help="repaint and flip the whole screen every gameplay frame instead of dirty rects")
+    parser.add_argument('--sim-thread', action='store_true',
+                        help="run the gameplay simulation on its own thread and report tick and frame rates")
+    parser.add_argument('--profile-csv', metavar='PATH', help="profile every frame and dump the per-phase timings to CSV on exit")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.bench:
+        run_benchmarks(args.bench_output, args.bench_iterations)
+    elif args.leaderboard:
+        print_leaderboard()
+    elif args.evaluate:
+        evaluate_policy(args.policy, args.evaluate, args.difficulty, args.workers)
+    elif args.replay and args.replay_speed == 0:
+        sys.exit(1 if check_replays(args.replay) else 0)
+    elif args.replay:
+        set_render_scale(args.render_scale)
+        for path in args.replay:
+            play_replay(Replay.load(path), args.replay_speed)
+        pygame.quit()
+    else:
+        set_render_scale(args.render_scale)
+        main(args.profile_csv, args.seed, args.record, args.startup_timing, not args.full_redraw,
+             args.quality, args.quality_log, args.fullscreen, threaded_sim=args.sim_thread)
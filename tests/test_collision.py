@@ -0,0 +1,35 @@
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest
+
+import main
+
+
+def brute_force_collides(sim):
+    """Narrowphase every obstacle the field holds against the player"""
+    player_rect, player_height = sim.player.get_hitbox()
+    field = sim.obstacles
+    for i in range(len(field)):
+        obs_rect = main.obstacle_hitbox(field.world_x[i], field.world_y[i], field.base_width, field.base_height)
+        if main.check_collision(player_rect, player_height, obs_rect, field.height[i]):
+            return True
+    return False
+
+
+@pytest.mark.parametrize('difficulty', list(main.DIFFICULTIES))
+def test_broadphase_matches_brute_force_on_real_runs(difficulty):
+    ticks = 0
+    for seed in range(40):
+        sim = main.GameSimulation(main.BLUE, difficulty, seed)
+        inputs_rng = random.Random(seed)
+        while sim.state == "playing" and ticks < 60000:
+            inputs = {'a': inputs_rng.random() < 0.05, 'd': inputs_rng.random() < 0.05,
+                      'jump': inputs_rng.random() < 0.01}
+            state = sim.step(inputs)
+            ticks += 1
+            assert (state == "game_over") == brute_force_collides(sim), (seed, ticks)
+    assert ticks > 1000